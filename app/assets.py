@@ -0,0 +1,160 @@
+"""Static assets: a build step that minifies, fingerprints and precompresses them, and the app that serves them."""
+import functools
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import stat
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .config import env_int
+
+STATIC_URL_PREFIX = "/static"
+STATIC_SOURCE_DIR = "app/static"
+# Written by `python -m app.manage build-assets`; until it exists the sources are served as they are
+STATIC_BUILD_DIR = os.getenv("STATIC_BUILD_DIR", "app/static-build")
+STATIC_MANIFEST = "manifest.json"
+# For files requested by their plain name, which can change under the same URL
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "no-cache")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Below this a compressed copy saves less than it costs to look up
+STATIC_COMPRESS_MIN_SIZE = env_int("STATIC_COMPRESS_MIN_SIZE", 1024)
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".map", ".json", ".svg", ".txt", ".html")
+# In order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def minify(path: str, data: bytes) -> bytes:
+    # Bang comments are kept, they carry the licence headers
+    if path.endswith((".min.js", ".min.css")):
+        return data
+    if path.endswith(".js"):
+        import rjsmin
+
+        return rjsmin.jsmin(data, keep_bang_comments=True)
+    if path.endswith(".css"):
+        import rcssmin
+
+        return rcssmin.cssmin(data, keep_bang_comments=True)
+    return data
+
+
+def fingerprint(path: str, data: bytes) -> str:
+    stem, suffix = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{suffix}"
+
+
+def compressed_variants(data: bytes) -> dict[str, bytes]:
+    import brotli
+
+    variants = {".br": brotli.compress(data, quality=11), ".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data)}
+
+
+def write_asset(output: str, path: str, data: bytes):
+    target = os.path.join(output, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as file:
+        file.write(data)
+    if path.endswith(COMPRESSIBLE_SUFFIXES) and len(data) >= STATIC_COMPRESS_MIN_SIZE:
+        for suffix, body in compressed_variants(data).items():
+            with open(target + suffix, "wb") as file:
+                file.write(body)
+
+
+def build_assets(source: str = STATIC_SOURCE_DIR, output: str = STATIC_BUILD_DIR) -> dict[str, str]:
+    """Writes every source file to `output` under its own name and a content-hashed one, each with .br/.gz
+    copies, and returns the manifest mapping the first to the second."""
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    manifest = {}
+    for directory, _, file_names in os.walk(source):
+        for file_name in sorted(file_names):
+            source_path = os.path.join(directory, file_name)
+            path = os.path.relpath(source_path, source).replace(os.sep, "/")
+            with open(source_path, "rb") as file:
+                data = minify(path, file.read())
+            manifest[path] = fingerprint(path, data)
+            write_asset(output, path, data)
+            write_asset(output, manifest[path], data)
+    with open(os.path.join(output, STATIC_MANIFEST), "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+@functools.cache
+def load_manifest(directory: str) -> dict[str, str]:
+    try:
+        with open(os.path.join(directory, STATIC_MANIFEST)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def static_directory() -> str:
+    return STATIC_BUILD_DIR if os.path.isfile(os.path.join(STATIC_BUILD_DIR, STATIC_MANIFEST)) else STATIC_SOURCE_DIR
+
+
+def static_url(path: str) -> str:
+    """The URL of a static file, fingerprinted once the assets are built; for templates."""
+    path = path.lstrip("/")
+    return f"{STATIC_URL_PREFIX}/{load_manifest(static_directory()).get(path, path)}"
+
+
+def accepted_encodings(header: str) -> set[str]:
+    encodings = set()
+    for item in header.split(","):
+        name, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip() and quality > 0:
+            encodings.add(name.strip().lower())
+    if "*" in encodings:
+        encodings.update(encoding for encoding, _ in ENCODINGS)
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that sends the .br or .gz copy of a file when the client accepts it, and lets clients keep
+    fingerprinted files forever since a change always gives them a new name."""
+
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.fingerprinted = set(load_manifest(directory).values())
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = None
+        request_headers = Headers(scope=scope)
+        # Ranges are served from the plain file; a byte range of the compressed copy can't be decoded on its own
+        if (scope["method"] in ("GET", "HEAD") and path.endswith(COMPRESSIBLE_SUFFIXES)
+                and "range" not in request_headers):
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                    # The media type is still guessed from the name before the .br/.gz
+                    response = self.file_response(full_path, stat_result, scope)
+                    response.headers["Content-Encoding"] = encoding
+                    break
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = (IMMUTABLE_CACHE_CONTROL if path.replace(os.sep, "/") in
+                                                 self.fingerprinted else STATIC_CACHE_CONTROL)
+            if path.endswith(COMPRESSIBLE_SUFFIXES):
+                response.headers["Vary"] = "Accept-Encoding"
+        return response
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from .config import env_int, env_float
+
+TODO_CACHE_BACKEND = os.getenv("TODO_CACHE_BACKEND", "memory")
+TODO_CACHE_URL = os.getenv("TODO_CACHE_URL", "redis://localhost:6379/0")
+TODO_CACHE_SIZE = env_int("TODO_CACHE_SIZE", 10000)
+TODO_CACHE_TTL = env_float("TODO_CACHE_TTL", 60)
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with optional per-entry expiry and hit/miss counters."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryCacheBackend:
+    """Per-process backend; each worker keeps its own copy."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str):
+        self._cache.delete(key)
+
+    async def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "size": len(self._cache), "maxsize": self._cache.maxsize,
+                "evictions": self._cache.evictions}
+
+
+class SharedCacheBackend:
+    """Backend for a store shared by all workers, e.g. a redis.asyncio client.
+
+    The client only needs async get(key), set(key, value, ex=seconds), delete(key) and flushdb().
+    Values are stored as JSON so every worker reads back the same plain data.
+    """
+
+    def __init__(self, client, ttl: Optional[float] = None):
+        self._client = client
+        self._ttl = ttl
+
+    async def get(self, key: str) -> Any:
+        raw = await self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self._ttl if ttl is None else ttl
+        await self._client.set(key, json.dumps(value), ex=max(1, int(ttl)) if ttl is not None else None)
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+    async def clear(self):
+        await self._client.flushdb()
+
+    def stats(self) -> dict:
+        return {"backend": type(self._client).__name__}
+
+
+class LocalSharedStore:
+    """In-process stand-in for a shared store with the subset of the redis.asyncio API the backend uses."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._values: dict[str, tuple[str, Optional[float]]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        value, expires_at = self._values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self._clock():
+            self._values.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None):
+        self._values[key] = (value, self._clock() + ex if ex is not None else None)
+
+    async def delete(self, key: str):
+        self._values.pop(key, None)
+
+    async def flushdb(self):
+        self._values.clear()
+
+
+class TodoCache:
+    """Read-through cache of todo reads, scoped per user.
+
+    Every key embeds the user's current generation token. Invalidating a user just drops that token, so all
+    of their entries become unreachable at once without scanning keys. A reader takes the generation before it
+    queries and stores its result under that same one, so a read that raced a write can only ever land under
+    the old, already unreachable generation.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def generation(self, user_id: int) -> str:
+        generation_key = f"todos:{user_id}:generation"
+        generation = await self.backend.get(generation_key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            await self.backend.set(generation_key, generation)
+        return generation
+
+    async def get(self, user_id: int, key: str, generation: str) -> Any:
+        value = await self.backend.get(f"todos:{user_id}:{generation}:{key}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, user_id: int, key: str, value: Any, generation: str):
+        # Never looks the generation up again; one taken after the query could be newer than the data
+        await self.backend.set(f"todos:{user_id}:{generation}:{key}", value)
+
+    async def invalidate(self, user_id: int):
+        self.invalidations += 1
+        await self.backend.delete(f"todos:{user_id}:generation")
+
+    async def clear(self):
+        await self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_todo_cache() -> TodoCache:
+    if TODO_CACHE_BACKEND == "redis":
+        # Optional dependency, only needed when the cache is shared between workers
+        import redis.asyncio
+
+        return TodoCache(SharedCacheBackend(redis.asyncio.from_url(TODO_CACHE_URL), ttl=TODO_CACHE_TTL))
+    if TODO_CACHE_BACKEND == "local-shared":
+        return TodoCache(SharedCacheBackend(LocalSharedStore(), ttl=TODO_CACHE_TTL))
+    return TodoCache(MemoryCacheBackend(maxsize=TODO_CACHE_SIZE, ttl=TODO_CACHE_TTL))
+
+
+todo_cache = build_todo_cache()
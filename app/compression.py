@@ -0,0 +1,145 @@
+"""Response compression: gzip always, brotli and zstd when their packages are installed."""
+import functools
+import importlib
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .assets import accepted_encodings
+from .config import env_int, env_bool
+
+COMPRESSION_ENABLED = env_bool("COMPRESSION_ENABLED", True)
+# In order of preference; an encoding whose package is missing is skipped
+COMPRESSION_ENCODINGS = tuple(os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(","))
+# Smaller bodies fit in a packet or two anyway, compressing them only costs CPU
+COMPRESSION_MINIMUM_SIZE = env_int("COMPRESSION_MINIMUM_SIZE", 1024)
+# Per-response levels, not the build-time maximums the static assets use; see benchmarks/compression.py
+COMPRESSION_GZIP_LEVEL = env_int("COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = env_int("COMPRESSION_BROTLI_QUALITY", 4)
+COMPRESSION_ZSTD_LEVEL = env_int("COMPRESSION_ZSTD_LEVEL", 3)
+
+ENCODING_MODULES = {"br": "brotli", "zstd": "zstandard", "gzip": "zlib"}
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+
+@functools.cache
+def available_encodings() -> tuple[str, ...]:
+    available = []
+    for encoding in COMPRESSION_ENCODINGS:
+        try:
+            importlib.import_module(ENCODING_MODULES[encoding])
+        except (KeyError, ImportError):
+            continue
+        available.append(encoding)
+    return tuple(available)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = accepted_encodings(accept_encoding)
+    return next((encoding for encoding in available_encodings() if encoding in accepted), None)
+
+
+class StreamCompressor:
+    """Compresses one response body. Every chunk is flushed on its own, so a streamed response reaches the
+    client as it is produced instead of when the compressor's window fills."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            import brotli
+
+            compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._compress, self._flush, self._finish = compressor.process, compressor.flush, compressor.finish
+        elif encoding == "zstd":
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+            self._compress, self._finish = compressor.compress, compressor.flush
+            self._flush = functools.partial(compressor.flush, zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        else:
+            # wbits 31 writes the gzip header and trailer around the deflate stream
+            compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress, self._finish = compressor.compress, compressor.flush
+            self._flush = functools.partial(compressor.flush, zlib.Z_SYNC_FLUSH)
+
+    def compress(self, data: bytes, more: bool) -> bytes:
+        return self._compress(data) + (self._flush() if more else self._finish())
+
+
+def should_compress(status_code: int, headers: Headers, body: bytes, more: bool) -> bool:
+    # Precompressed static files already carry a Content-Encoding
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    # Content-Range counts bytes of the identity body, which a compressed slice would no longer match
+    if status_code == 206 or "content-range" in headers:
+        return False
+    if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+        return False
+    if more:
+        content_length = headers.get("content-length")
+        return content_length is None or int(content_length) >= COMPRESSION_MINIMUM_SIZE
+    return len(body) >= COMPRESSION_MINIMUM_SIZE
+
+
+class CompressionMiddleware:
+    """Pure ASGI, like TimingMiddleware; holds back the response start until the first body chunk shows whether
+    the response is worth compressing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not COMPRESSION_ENABLED or scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or (start is None and compressor is None):
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=list(start.get("headers", [])))
+                if not should_compress(start["status"], headers, body, more):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                compressor = StreamCompressor(encoding)
+                body = compressor.compress(body, more)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # A strong ETag names the identity bytes; the compressed body only matches it weakly
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send({**start, "headers": headers.raw})
+                start = None
+            else:
+                body = compressor.compress(body, more)
+            await send({**message, "body": body, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,60 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored on both sides
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque_tag for candidate in if_none_match.split(","))
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(as_utc(value), usegmt=True)
+
+
+def modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = as_utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return True
+    # HTTP dates only have second precision
+    return as_utc(last_modified).replace(microsecond=0) > since
+
+
+def check_conditional(request: Request, response: Response, etag: str,
+                      last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Sets the validators on the response and returns a 304 if the client's copy is still current."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag_matches(if_none_match, etag)
+    elif last_modified is not None and "if-modified-since" in request.headers:
+        fresh = not modified_since(request.headers["if-modified-since"], last_modified)
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers})
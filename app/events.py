@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Callable
+
+from sqlalchemy.engine import make_url
+
+from .config import env_int
+from .database import SQLALCHEMY_DATABASE_URL
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "todo_events")
+EVENTS_QUEUE_SIZE = env_int("EVENTS_QUEUE_SIZE", 100)
+# Keeps each NOTIFY payload well under Postgres' 8000 byte limit
+EVENTS_MAX_IDS = env_int("EVENTS_MAX_IDS", 500)
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One stream's bounded buffer of events for a single user."""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event: dict) -> bool:
+        # Never blocks the publisher; a reader that falls behind is told to resync instead
+        if self.overflowed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+    async def get(self) -> dict:
+        if self.overflowed and self._queue.empty():
+            self.overflowed = False
+            return {"type": "resync", "user_id": self.user_id}
+        return await self._queue.get()
+
+
+class MemoryBroker:
+    """Delivers events within this process only; the stand-in for a single worker and for tests."""
+
+    def attach(self, dispatch: Callable[[dict], None]):
+        self._dispatch = dispatch
+
+    async def start(self):
+        pass
+
+    async def publish(self, event: dict):
+        self._dispatch(event)
+
+    async def stop(self):
+        pass
+
+
+class PostgresBroker:
+    """Fans events out to every worker through LISTEN/NOTIFY on a dedicated asyncpg connection."""
+
+    def __init__(self, dsn: str, channel: str = EVENTS_CHANNEL):
+        self._dsn = dsn
+        self._channel = channel
+        self._connection = None
+        self._lock = asyncio.Lock()
+
+    def attach(self, dispatch: Callable[[dict], None]):
+        self._dispatch = dispatch
+
+    async def start(self):
+        import asyncpg
+
+        self._connection = await asyncpg.connect(self._dsn)
+        self._connection.add_termination_listener(
+            lambda _: logger.error("Lost the LISTEN connection, live updates from other workers have stopped"))
+        await self._connection.add_listener(self._channel,
+                                            lambda _connection, _pid, _channel, payload: self._dispatch(json.loads(payload)))
+
+    async def publish(self, event: dict):
+        # asyncpg connections run one query at a time
+        async with self._lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", self._channel, json.dumps(event))
+
+    async def stop(self):
+        if self._connection is not None:
+            await self._connection.close()
+
+
+class EventHub:
+    """Fans todo change events out to the open streams of the user they belong to."""
+
+    def __init__(self, broker, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.broker = broker
+        self.queue_size = queue_size
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self.delivered = 0
+        self.dropped = 0
+        broker.attach(self.dispatch)
+
+    async def start(self):
+        await self.broker.start()
+
+    async def stop(self):
+        await self.broker.stop()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.user_id, set())
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            self._subscriptions.pop(subscription.user_id, None)
+
+    def dispatch(self, event: dict):
+        for subscription in self._subscriptions.get(event["user_id"], ()):
+            if subscription.put(event):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+
+    async def publish(self, user_id: int, event_type: str, ids: list[int]):
+        for start in range(0, len(ids), EVENTS_MAX_IDS):
+            event = {"type": event_type, "user_id": user_id, "ids": ids[start:start + EVENTS_MAX_IDS]}
+            try:
+                await self.broker.publish(event)
+            except Exception:
+                # The write has already committed; a lost event only delays other devices until they refetch
+                logger.exception("Could not publish %s event for user %s", event_type, user_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.broker).__name__,
+            "users": len(self._subscriptions),
+            "subscriptions": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+def build_event_hub() -> EventHub:
+    if EVENTS_BACKEND == "postgres":
+        dsn = make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        return EventHub(PostgresBroker(dsn))
+    return EventHub(MemoryBroker())
+
+
+event_hub = build_event_hub()
@@ -1,12 +1,33 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.staticfiles import StaticFiles
 
-from .database import engine
-from .models import Base
-from .routers import todos, auth, admin, users
+from .assets import PrecompressedStaticFiles, static_directory
+from .compression import CompressionMiddleware
+from .database import get_engine, dispose_engine, warm_up_pool
+from .events import event_hub
+from .responses import get_json_response_class
+from .routers import todos, auth, admin, users, metrics
+from .timing import TimingMiddleware
+
+# orjson, pydantic or json; see app/responses.py
+JSON_RESPONSE_CLASS = os.getenv("JSON_RESPONSE_CLASS", "orjson")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # The schema belongs to Alembic: run `alembic upgrade head` once per deploy, not in every worker
+    get_engine()
+    await warm_up_pool()
+    await event_hub.start()
+    yield
+    await event_hub.stop()
+    await dispose_engine()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=get_json_response_class(JSON_RESPONSE_CLASS))
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,9 +36,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-Base.metadata.create_all(bind=engine)
+app.add_middleware(CompressionMiddleware)
+# Added last so it is outermost and its timings include the other middleware
+app.add_middleware(TimingMiddleware)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# The built, fingerprinted assets once `python -m app.manage build-assets` has run, the sources until then
+app.mount("/static", PrecompressedStaticFiles(directory=static_directory()), name="static")
 
 
 @app.get("/")
@@ -29,3 +53,4 @@ app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(admin.router)
 app.include_router(users.router)
+app.include_router(metrics.router)
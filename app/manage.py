@@ -0,0 +1,169 @@
+"""Operational commands, run as `python -m app.manage <command>`."""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select, delete, insert, func, tuple_, text, create_engine, inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .assets import STATIC_BUILD_DIR, build_assets
+from .database import SQLALCHEMY_DATABASE_URL, get_session_factory, dispose_engine
+from .models import Todos, TodoCounters, utcnow
+from .passwords import HASH_SCHEMES, PASSWORD_HASH_SCHEME, calibrate
+from .routers.todos import TODOS_TOMBSTONE_RETENTION_DAYS, TODO_IS_LIVE
+from .templating import TEMPLATES_BYTECODE_DIR, compile_templates
+
+
+def calibrate_password_hash(args: argparse.Namespace):
+    cost, elapsed_ms = calibrate(args.scheme, args.target_ms)
+    print(f"{args.scheme} cost {cost} takes {elapsed_ms:.1f} ms per hash on this machine")
+    print(f"PASSWORD_HASH_SCHEME={args.scheme}")
+    print(f"PASSWORD_HASH_COST={cost}")
+
+
+async def purge_tombstones(session_factory: async_sessionmaker, older_than: datetime, batch_size: int) -> int:
+    # Small batches, each in its own transaction, so the purge never holds locks on a large part of the table
+    purged = 0
+    while True:
+        batch = select(Todos.id).where(Todos.deleted_at < older_than).limit(batch_size).scalar_subquery()
+        async with session_factory() as db:
+            result = await db.execute(delete(Todos).where(Todos.id.in_(batch))
+                                      .execution_options(synchronize_session=False))
+            await db.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+
+async def run_purge_tombstones(args: argparse.Namespace):
+    older_than = utcnow() - timedelta(days=args.older_than_days)
+    try:
+        purged = await purge_tombstones(get_session_factory(), older_than, args.batch_size)
+    finally:
+        await dispose_engine()
+    print(f"Purged {purged} tombstones deleted before {older_than.isoformat()}")
+
+
+def purge_tombstones_command(args: argparse.Namespace):
+    asyncio.run(run_purge_tombstones(args))
+
+
+async def reconcile_todo_stats(session_factory: async_sessionmaker) -> int:
+    # Recounts every bucket from the todos and rewrites the counters that drifted
+    bucket = (Todos.user_id, func.coalesce(Todos.priority, 0), func.coalesce(Todos.completed, False))
+    async with session_factory() as db:
+        if db.get_bind().dialect.name == "postgresql":
+            # Writers wait on the counters until the recount commits, so none of their deltas land in between
+            await db.execute(text('LOCK TABLE "TodoCounters" IN EXCLUSIVE MODE'))
+        actual = {(user_id, priority, completed): count for user_id, priority, completed, count in
+                  (await db.execute(select(*bucket, func.count()).where(TODO_IS_LIVE).group_by(*bucket))).all()}
+        stored = {(user_id, priority, completed): count for user_id, priority, completed, count in
+                  (await db.execute(select(TodoCounters.user_id, TodoCounters.priority, TodoCounters.completed,
+                                           TodoCounters.count))).all()}
+        drifted = [key for key in actual.keys() | stored.keys() if actual.get(key, 0) != stored.get(key, 0)]
+        if drifted:
+            await db.execute(delete(TodoCounters).where(
+                tuple_(TodoCounters.user_id, TodoCounters.priority, TodoCounters.completed).in_(drifted)))
+            rows = [{"user_id": key[0], "priority": key[1], "completed": key[2], "count": actual[key]}
+                    for key in drifted if key in actual]
+            if rows:
+                await db.execute(insert(TodoCounters), rows)
+        await db.commit()
+    return len(drifted)
+
+
+async def run_reconcile_todo_stats(args: argparse.Namespace):
+    try:
+        drifted = await reconcile_todo_stats(get_session_factory())
+    finally:
+        await dispose_engine()
+    print(f"Reconciled todo stats, {drifted} counters had drifted")
+
+
+def reconcile_todo_stats_command(args: argparse.Namespace):
+    asyncio.run(run_reconcile_todo_stats(args))
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+# The schema the app's own create_all used to build on startup, before migrations took over
+CREATE_ALL_REVISION = "cb8cd8126844"
+
+
+def migrate(database_url: str) -> bool:
+    """Upgrades the database to the latest revision; returns whether it had to be stamped first."""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["database_url"] = database_url
+    engine = create_engine(database_url)
+    try:
+        tables = inspect(engine).get_table_names()
+    finally:
+        engine.dispose()
+    # A schema without Alembic's version table was made by create_all; upgrading it as if it were empty would fail
+    # on its first CREATE TABLE
+    stamp = "alembic_version" not in tables and "Todos" in tables
+    if stamp:
+        command.stamp(config, CREATE_ALL_REVISION)
+    command.upgrade(config, "head")
+    return stamp
+
+
+def migrate_command(args: argparse.Namespace):
+    if not SQLALCHEMY_DATABASE_URL:
+        raise SystemExit("DATABASE_URL is not set")
+    if migrate(SQLALCHEMY_DATABASE_URL):
+        print(f"Stamped the existing schema as revision {CREATE_ALL_REVISION} before upgrading")
+    print("Database is at the latest revision")
+
+
+def build_assets_command(args: argparse.Namespace):
+    manifest = build_assets()
+    print(f"Built {len(manifest)} static files into {STATIC_BUILD_DIR}")
+
+
+def compile_templates_command(args: argparse.Namespace):
+    compiled = compile_templates()
+    print(f"Compiled {compiled} templates into {TEMPLATES_BYTECODE_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = commands.add_parser("calibrate-password-hash",
+                                           help="pick the password hash cost that fits a latency budget")
+    calibrate_parser.add_argument("--scheme", choices=list(HASH_SCHEMES), default=PASSWORD_HASH_SCHEME)
+    calibrate_parser.add_argument("--target-ms", type=float, default=250)
+    calibrate_parser.set_defaults(handler=calibrate_password_hash)
+
+    purge_parser = commands.add_parser("purge-tombstones",
+                                       help="delete the tombstones of todos deleted longer ago than sync tokens live")
+    # Purging tombstones younger than the retention would let a client with a valid sync token miss a delete
+    purge_parser.add_argument("--older-than-days", type=int, default=TODOS_TOMBSTONE_RETENTION_DAYS)
+    purge_parser.add_argument("--batch-size", type=int, default=1000)
+    purge_parser.set_defaults(handler=purge_tombstones_command)
+
+    reconcile_parser = commands.add_parser("reconcile-todo-stats",
+                                           help="recount the todo stats counters and fix any that drifted")
+    reconcile_parser.set_defaults(handler=reconcile_todo_stats_command)
+
+    migrate_parser = commands.add_parser("migrate", help="run the migrations, adopting a schema made by create_all")
+    migrate_parser.set_defaults(handler=migrate_command)
+
+    assets_parser = commands.add_parser("build-assets",
+                                        help="minify, fingerprint and precompress the static files")
+    assets_parser.set_defaults(handler=build_assets_command)
+
+    compile_parser = commands.add_parser("compile-templates",
+                                         help="write the bytecode of every template to TEMPLATES_BYTECODE_DIR")
+    compile_parser.set_defaults(handler=compile_templates_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
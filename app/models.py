@@ -1,8 +1,14 @@
-from sqlalchemy import Integer, Column, String, Boolean, ForeignKey
+from datetime import datetime, timezone
+
+from sqlalchemy import Integer, Column, String, Boolean, ForeignKey, Index, DateTime, func, DDL, event, BigInteger
 
 from .database import Base
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Users(Base):
     __tablename__ = 'Users'
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -14,6 +20,8 @@ class Users(Base):
     is_active = Column(Boolean, default=True)
     role = Column(String(50))
     phone_number = Column(String(10), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow,
+                        server_default=func.now())
 
 
 class Todos(Base):
@@ -24,3 +32,122 @@ class Todos(Base):
     description = Column(String(255))
     priority = Column(Integer)
     completed = Column(Boolean, default=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow,
+                        server_default=func.now())
+    # Deleted todos stay behind as tombstones so delta sync can report them, until they are purged
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_Todos_user_id_id", "user_id", "id"),
+        Index("ix_Todos_user_id_completed_priority_id", "user_id", "completed", "priority", "id"),
+        Index("ix_Todos_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_Todos_deleted_at", "deleted_at"),
+    )
+
+
+class TodoCounters(Base):
+    # One row per (user, priority, completed) bucket of live todos, kept current by the triggers below
+    __tablename__ = "TodoCounters"
+    user_id = Column(Integer, ForeignKey('Users.id'), primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    completed = Column(Boolean, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
+# Full-text search lives outside the mapped columns, since each dialect needs a different structure for it:
+# Postgres gets a generated tsvector column with a GIN index, SQLite an FTS5 index kept in sync by triggers
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE "Todos" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED""",
+    """CREATE INDEX "ix_Todos_search_vector" ON "Todos" USING GIN (search_vector)""",
+]
+
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description, content='Todos', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER todos_fts_insert AFTER INSERT ON Todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER todos_fts_delete AFTER DELETE ON Todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON Todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Todos.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Todos.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Todos.__table__, "before_drop", DDL("DROP TABLE IF EXISTS todos_fts").execute_if(dialect="sqlite"))
+
+
+# Stats counters move in the same transaction as the write that changes a todo. Tombstones are not counted,
+# so a soft delete leaves its bucket and the purge of a tombstone changes nothing. NULL priority and completed
+# land in the 0 and false buckets, since a NULL can't be part of the key.
+POSTGRES_COUNTERS_DDL = [
+    """CREATE FUNCTION todo_counters_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL THEN
+            UPDATE "TodoCounters" SET count = count - 1
+            WHERE user_id = OLD.user_id AND priority = coalesce(OLD.priority, 0)
+                AND completed = coalesce(OLD.completed, false);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.deleted_at IS NULL THEN
+            INSERT INTO "TodoCounters" (user_id, priority, completed, count)
+            VALUES (NEW.user_id, coalesce(NEW.priority, 0), coalesce(NEW.completed, false), 1)
+            ON CONFLICT (user_id, priority, completed) DO UPDATE SET count = "TodoCounters".count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER todo_counters_insert_delete AFTER INSERT OR DELETE ON "Todos"
+    FOR EACH ROW EXECUTE FUNCTION todo_counters_apply()""",
+    # Title and description edits don't move a todo between buckets, so they skip the counters entirely
+    """CREATE TRIGGER todo_counters_update AFTER UPDATE ON "Todos" FOR EACH ROW
+    WHEN ((OLD.user_id, OLD.priority, OLD.completed, OLD.deleted_at IS NULL)
+        IS DISTINCT FROM (NEW.user_id, NEW.priority, NEW.completed, NEW.deleted_at IS NULL))
+    EXECUTE FUNCTION todo_counters_apply()""",
+]
+
+SQLITE_COUNTERS_MOVED = """(old.user_id IS NOT new.user_id OR old.priority IS NOT new.priority
+        OR old.completed IS NOT new.completed OR (old.deleted_at IS NULL) IS NOT (new.deleted_at IS NULL))"""
+
+SQLITE_COUNTERS_DDL = [
+    """CREATE TRIGGER todo_counters_insert AFTER INSERT ON Todos WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO TodoCounters (user_id, priority, completed, count)
+        VALUES (new.user_id, coalesce(new.priority, 0), coalesce(new.completed, 0), 1)
+        ON CONFLICT (user_id, priority, completed) DO UPDATE SET count = count + 1;
+    END""",
+    """CREATE TRIGGER todo_counters_delete AFTER DELETE ON Todos WHEN old.deleted_at IS NULL BEGIN
+        UPDATE TodoCounters SET count = count - 1
+        WHERE user_id = old.user_id AND priority = coalesce(old.priority, 0)
+            AND completed = coalesce(old.completed, 0);
+    END""",
+    f"""CREATE TRIGGER todo_counters_update_old AFTER UPDATE ON Todos
+    WHEN old.deleted_at IS NULL AND {SQLITE_COUNTERS_MOVED} BEGIN
+        UPDATE TodoCounters SET count = count - 1
+        WHERE user_id = old.user_id AND priority = coalesce(old.priority, 0)
+            AND completed = coalesce(old.completed, 0);
+    END""",
+    f"""CREATE TRIGGER todo_counters_update_new AFTER UPDATE ON Todos
+    WHEN new.deleted_at IS NULL AND {SQLITE_COUNTERS_MOVED} BEGIN
+        INSERT INTO TodoCounters (user_id, priority, completed, count)
+        VALUES (new.user_id, coalesce(new.priority, 0), coalesce(new.completed, 0), 1)
+        ON CONFLICT (user_id, priority, completed) DO UPDATE SET count = count + 1;
+    END""",
+]
+
+for statement in POSTGRES_COUNTERS_DDL:
+    event.listen(Todos.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_COUNTERS_DDL:
+    event.listen(Todos.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Todos.__table__, "before_drop",
+             DDL("DROP FUNCTION IF EXISTS todo_counters_apply() CASCADE").execute_if(dialect="postgresql"))
@@ -0,0 +1,24 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+# Every cursor value is compared with an integer column, so it has to fit a signed 64-bit one
+CURSOR_VALUE_MIN = -(2 ** 63)
+CURSOR_VALUE_MAX = 2 ** 63 - 1
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, minimum: int = CURSOR_VALUE_MIN) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if (not isinstance(values, list) or len(values) != size
+            or not all(type(value) is int and minimum <= value <= CURSOR_VALUE_MAX for value in values)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
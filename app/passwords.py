@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from fastapi import HTTPException, status
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+from .config import env_int
+
+# "cost" is each scheme's rounds knob: log2 work factor for bcrypt, log2 N for scrypt, time_cost for argon2
+HASH_SCHEMES = {
+    "bcrypt": {"default_cost": 12, "costs": range(4, 18)},
+    "scrypt": {"default_cost": 16, "costs": range(10, 21)},
+    "argon2": {"default_cost": 3, "costs": range(1, 16)},
+}
+
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+PASSWORD_HASH_COST = env_int("PASSWORD_HASH_COST", HASH_SCHEMES[PASSWORD_HASH_SCHEME]["default_cost"])
+PASSWORD_ARGON2_MEMORY_KIB = env_int("PASSWORD_ARGON2_MEMORY_KIB", 65536)
+
+# The hash backends release the GIL, so a thread pool gives real parallelism without pickling costs
+PASSWORD_HASH_WORKERS = env_int("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_DEPTH = env_int("PASSWORD_HASH_QUEUE_DEPTH", 32)
+
+
+def build_password_context(scheme: str, cost: int) -> "CryptContext":
+    # Every known scheme stays verifiable; anything but the configured scheme and cost reports needs_update
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=[scheme] + [other for other in HASH_SCHEMES if other != scheme],
+        default=scheme,
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__memory_cost=PASSWORD_ARGON2_MEMORY_KIB,
+        **{f"{scheme}__default_rounds": cost, f"{scheme}__min_rounds": cost},
+    )
+
+
+@functools.cache
+def get_password_context() -> "CryptContext":
+    # Built on the first hash or verify, so passlib and the hash backends stay out of the startup path
+    return build_password_context(PASSWORD_HASH_SCHEME, PASSWORD_HASH_COST)
+
+
+class PasswordHasherPool:
+    """Bounded executor for password hashing that sheds load instead of queueing forever."""
+
+    def __init__(self, workers: int, queue_depth: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._capacity = workers + queue_depth
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args):
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self._pending >= self._capacity:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many password operations in progress, please retry",
+                                headers={"Retry-After": "1"})
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+
+hasher_pool = PasswordHasherPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_DEPTH)
+
+
+async def hash_password(password: str) -> str:
+    return await hasher_pool.run(get_password_context().hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await hasher_pool.run(get_password_context().verify, password, hashed_password)
+
+
+def password_needs_update(hashed_password: str) -> bool:
+    return get_password_context().needs_update(hashed_password)
+
+
+def calibrate(scheme: str, target_ms: float, samples: int = 3) -> tuple[int, float]:
+    """Return the highest cost whose median hash time stays within target_ms, and that time."""
+    measured = []
+    for cost in HASH_SCHEMES[scheme]["costs"]:
+        context = build_password_context(scheme, cost)
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            context.hash("calibration-password")
+            timings.append((time.perf_counter() - started) * 1000)
+        measured.append((cost, statistics.median(timings)))
+        if measured[-1][1] > target_ms:
+            break
+    within_budget = [result for result in measured if result[1] <= target_ms]
+    # Even the cheapest cost may be over budget on slow hardware; report it rather than nothing
+    return within_budget[-1] if within_budget else measured[0]
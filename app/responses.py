@@ -0,0 +1,47 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic_core import to_json
+
+from .timing import timed
+
+
+class PydanticJSONResponse(JSONResponse):
+    """Renders with pydantic-core's Rust encoder, for deployments without orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+class StdlibJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class TimedRenderMixin:
+    """Counts encoding the body towards the request's serialize phase in Server-Timing."""
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+def timed_render(response_class: type[JSONResponse]) -> type[JSONResponse]:
+    return type(f"Timed{response_class.__name__}", (TimedRenderMixin, response_class), {})
+
+
+JSON_RESPONSE_CLASSES = {
+    "orjson": timed_render(ORJSONResponse),
+    "pydantic": timed_render(PydanticJSONResponse),
+    "json": timed_render(StdlibJSONResponse),
+}
+
+
+def get_json_response_class(name: str) -> type[JSONResponse]:
+    if name not in JSON_RESPONSE_CLASSES:
+        raise ValueError(f"JSON_RESPONSE_CLASS must be one of {', '.join(JSON_RESPONSE_CLASSES)}, got {name!r}")
+    if name == "orjson":
+        # ORJSONResponse only fails when it first renders; fail at startup instead
+        import orjson  # noqa: F401
+    return JSON_RESPONSE_CLASSES[name]
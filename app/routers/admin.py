@@ -1,13 +1,27 @@
-from typing import Annotated, Optional
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Annotated, Optional, Literal, AsyncIterator
 
-from fastapi import status, HTTPException, Path, APIRouter
+from fastapi import status, HTTPException, Path, APIRouter, Query, Response
 from fastapi.params import Depends
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.responses import StreamingResponse
 
 from .auth import current_user_dependency, authenticate_role
-from ..database import SessionLocal
-from ..models import Todos
+from .todos import TODO_COLUMNS, TODO_IS_LIVE, TodoResponse, TodoStatsResponse, todos_changed, fetch_todo_stats
+from ..config import env_int
+from ..database import get_db, get_session_factory
+from ..models import Todos, utcnow
+from ..pagination import encode_cursor, decode_cursor
+
+ADMIN_PAGE_SIZE_DEFAULT = env_int("ADMIN_PAGE_SIZE_DEFAULT", 100)
+ADMIN_PAGE_SIZE_MAX = env_int("ADMIN_PAGE_SIZE_MAX", 1000)
+ADMIN_EXPORT_BATCH_SIZE = env_int("ADMIN_EXPORT_BATCH_SIZE", 1000)
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
 
 router = APIRouter(
     prefix="/todos/admin",
@@ -15,15 +29,8 @@ router = APIRouter(
 )
 
 
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+session_factory_dependency = Annotated[async_sessionmaker, Depends(get_session_factory)]
 
 
 class TodoRequest(BaseModel):
@@ -45,26 +52,93 @@ class TodoRequest(BaseModel):
     }
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_todos(db: db_dependency, current_user: current_user_dependency):
+def encode_ndjson(rows) -> bytes:
+    # The only non-JSON column is updated_at; jsonable_encoder per row costs more than the query
+    return "".join(json.dumps(row._asdict(), default=datetime.isoformat) + "\n" for row in rows).encode()
+
+
+def encode_csv(rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(column.key for column in TODO_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(session_factory: async_sessionmaker, export_format: str,
+                        user_id: Optional[int]) -> AsyncIterator[bytes]:
+    # Runs after the request-scoped session is gone, so it opens its own; yield_per keeps a server-side cursor
+    # open and only ever holds one batch of rows in memory
+    query = (select(*TODO_COLUMNS).where(TODO_IS_LIVE).order_by(Todos.id)
+             .execution_options(yield_per=ADMIN_EXPORT_BATCH_SIZE))
+    if user_id is not None:
+        query = query.where(Todos.user_id == user_id)
+    async with session_factory() as db:
+        result = await db.stream(query)
+        header = True
+        async for rows in result.partitions():
+            yield encode_ndjson(rows) if export_format == "ndjson" else encode_csv(rows, header)
+            header = False
+        if header and export_format == "csv":
+            yield encode_csv([], header)
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[TodoResponse])
+async def get_todos(db: db_dependency, current_user: current_user_dependency, response: Response,
+                    limit: int = Query(default=ADMIN_PAGE_SIZE_DEFAULT, gt=0, le=ADMIN_PAGE_SIZE_MAX),
+                    cursor: Optional[str] = None,
+                    user_id: Optional[int] = Query(default=None, gt=0)):
+    authenticate_role(current_user["user_role"], "admin")
+    query = select(*TODO_COLUMNS).where(TODO_IS_LIVE)
+    if user_id is not None:
+        query = query.where(Todos.user_id == user_id)
+    if cursor is not None:
+        query = query.where(Todos.id > decode_cursor(cursor, 1)[0])
+
+    result = await db.execute(query.order_by(Todos.id).limit(limit + 1))
+    rows = result.mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    return rows
+
+
+@router.get("/export", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def export_todos(session_factory: session_factory_dependency, current_user: current_user_dependency,
+                       export_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format"),
+                       user_id: Optional[int] = Query(default=None, gt=0)):
+    authenticate_role(current_user["user_role"], "admin")
+    return StreamingResponse(stream_export(session_factory, export_format, user_id),
+                             media_type=EXPORT_MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition": f'attachment; filename="todos.{export_format}"'})
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsResponse)
+async def get_todo_stats(db: db_dependency, current_user: current_user_dependency):
     authenticate_role(current_user["user_role"], "admin")
-    return db.query(Todos).all()
+    return await fetch_todo_stats(db)
 
 
-@router.get("/{todo_id}", status_code=status.HTTP_200_OK)
+@router.get("/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse)
 async def get_todo_by_id(db: db_dependency, current_user: current_user_dependency, todo_id: int = Path(gt=0)):
     authenticate_role(current_user["user_role"], "admin")
-    todo = db.query(Todos).where(Todos.id == todo_id).first()
+    result = await db.execute(select(*TODO_COLUMNS).where(Todos.id == todo_id, TODO_IS_LIVE))
+    todo = result.mappings().first()
     if todo is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
     return todo
 
 
-@router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def delete_todo(db: db_dependency, current_user: current_user_dependency, todo_id: int = Path(gt=0)):
     authenticate_role(current_user["user_role"], "admin")
-    todo = db.query(Todos).where(Todos.id == todo_id).first()
-    if todo is None:
+    owner_id = await db.scalar(update(Todos)
+                               .where(Todos.id == todo_id, TODO_IS_LIVE)
+                               .values(deleted_at=utcnow())
+                               .returning(Todos.user_id)
+                               .execution_options(synchronize_session=False))
+    if owner_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
-    db.delete(todo)
-    db.commit()
+    await db.commit()
+    await todos_changed(owner_id, "deleted", [todo_id])
@@ -1,25 +1,38 @@
+import hashlib
+import os
+import time
 from datetime import timedelta, datetime, timezone
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, status, Depends, HTTPException, Request
+from fastapi import APIRouter, status, Depends, HTTPException, Request, BackgroundTasks
+from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from fastapi.templating import Jinja2Templates
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from ..database import SessionLocal
+from ..cache import LRUCache
+from ..config import env_int
+from ..database import get_db, get_session_factory
 from ..models import Users
+from ..passwords import hash_password, verify_password, password_needs_update
+from ..templating import get_templates
+from ..timing import timed_call
 
 SECRET_KEY = "sieunhandosieunhandensieunhanvangsieunhanhhongsieunhancam"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# "jose" (python-jose) or "pyjwt"; both verify the same HS256 tokens
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+TOKEN_CACHE_SIZE = env_int("TOKEN_CACHE_SIZE", 10000)
+
+# Verified claims keyed by token digest, each entry living until its token's exp
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
 
-templates = Jinja2Templates(directory="app/templates")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 router = APIRouter(
     prefix="/auth",
@@ -27,9 +40,11 @@ router = APIRouter(
 )
 
 
-def authenticate_user_credentials(db: Session, form_data: OAuth2PasswordRequestForm):
-    user_model = db.query(Users).where(Users.username == form_data.username).first()
-    if not user_model or not bcrypt_context.verify(form_data.password, user_model.hashed_password):
+async def authenticate_user_credentials(db: AsyncSession, form_data: OAuth2PasswordRequestForm):
+    user_model = await db.scalar(select(Users).where(Users.username == form_data.username))
+    # End the read transaction so the pooled connection isn't held while the hash is checked
+    await db.commit()
+    if not user_model or not await verify_password(form_data.password, user_model.hashed_password):
         return None
     return user_model
 
@@ -44,31 +59,62 @@ def generate_access_token(claims: dict, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+def decode_access_token(token: str, backend: str = JWT_BACKEND) -> dict:
+    if backend == "pyjwt":
+        # Only imported when configured, jose is the default
+        import jwt as pyjwt
+
+        try:
+            return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except pyjwt.PyJWTError as ex:
+            raise JWTError(str(ex))
+    return jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
+
+
+@timed_call("auth")
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+    token_digest = hashlib.sha256(token.encode()).digest()
+    current_user = token_cache.get(token_digest)
+    if current_user is not None:
+        return dict(current_user)
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
+        payload = decode_access_token(token)
         username, user_id, user_role = payload.get("sub"), payload.get("user_id"), payload.get("user_role")
         if not username or not user_id or not user_role:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-        return {"username": username, "user_id": user_id, "user_role": user_role}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
 
+    current_user = {"username": username, "user_id": user_id, "user_role": user_role}
+    if isinstance(payload.get("exp"), (int, float)):
+        token_cache.set(token_digest, current_user, ttl=payload["exp"] - time.time())
+    return dict(current_user)
+
+
+async def rehash_password(session_factory: async_sessionmaker, user_id: int, old_hash: str, password: str):
+    try:
+        new_hash = await hash_password(password)
+    except HTTPException:
+        # The hasher pool is saturated; the next login will try again
+        return
+    async with session_factory() as db:
+        # Only replace the hash we verified, never one written by a concurrent password change
+        await db.execute(update(Users)
+                         .where(Users.id == user_id, Users.hashed_password == old_hash)
+                         .values(hashed_password=new_hash))
+        await db.commit()
+
 
 def authenticate_role(user_role: str, role: str):
     if user_role != role:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot perform this action")
 
 
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+session_factory_dependency = Annotated[async_sessionmaker, Depends(get_session_factory)]
 current_user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
@@ -113,33 +159,45 @@ class CreateUserRequest(BaseModel):
     }
 
 
-@router.get("/login-page")
+class StatusResponse(BaseModel):
+    status: str
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+
+
+@router.get("/login-page", response_class=HTMLResponse)
 async def render_login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return get_templates().TemplateResponse("login.html", {"request": request})
 
 
-@router.get("/register-page")
+@router.get("/register-page", response_class=HTMLResponse)
 async def render_register_page(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
+    return get_templates().TemplateResponse("register.html", {"request": request})
 
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
+@router.post("/register", status_code=status.HTTP_201_CREATED, response_model=StatusResponse)
 async def register(db: db_dependency, user_request: CreateUserRequest):
     # if user_request.password != user_request.password_confirm:
     #     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords don't match")
 
     user_model = Users(**user_request.model_dump(exclude={"password", "password_confirm"}),
-                       hashed_password=bcrypt_context.hash(user_request.password))
+                       hashed_password=await hash_password(user_request.password))
     db.add(user_model)
-    db.commit()
+    await db.commit()
     return {"status": "New account was created"}
 
 
-@router.post("/login", status_code=status.HTTP_200_OK)
-async def login(db: db_dependency, form_data: OAuth2PasswordRequestForm = Depends()):
-    user_model = authenticate_user_credentials(db, form_data)
+@router.post("/login", status_code=status.HTTP_200_OK, response_model=TokenResponse)
+async def login(db: db_dependency, session_factory: session_factory_dependency, background_tasks: BackgroundTasks,
+                form_data: OAuth2PasswordRequestForm = Depends()):
+    user_model = await authenticate_user_credentials(db, form_data)
     if user_model is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
+    if password_needs_update(user_model.hashed_password):
+        background_tasks.add_task(rehash_password, session_factory, user_model.id, user_model.hashed_password,
+                                  form_data.password)
 
     claims = {"sub": user_model.username, "user_id": user_model.id, "user_role": user_model.role}
     access_token = generate_access_token(claims, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -0,0 +1,90 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from .auth import token_cache, current_user_dependency, authenticate_role
+from ..cache import todo_cache
+from ..database import pool_status
+from ..events import event_hub
+from ..timing import request_metrics
+
+
+async def require_admin(current_user: current_user_dependency):
+    # Route names, traffic and pool and cache internals are not for the public; scrapers send an admin's token
+    authenticate_role(current_user["user_role"], "admin")
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(require_admin)]
+)
+
+
+class PoolMetricsResponse(BaseModel):
+    size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    waits: int
+    timeouts: int
+    wait_time_total_ms: float
+    wait_time_max_ms: float
+
+
+class TokenCacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_ratio: float
+
+
+class TodoCacheStats(BaseModel):
+    backend: str
+    hits: int
+    misses: int
+    invalidations: int
+    hit_ratio: float
+    # Only reported by the in-process backend
+    size: Optional[int] = None
+    maxsize: Optional[int] = None
+    evictions: Optional[int] = None
+
+
+class EventMetricsResponse(BaseModel):
+    backend: str
+    users: int
+    subscriptions: int
+    delivered: int
+    dropped: int
+
+
+class CacheMetricsResponse(BaseModel):
+    tokens: TokenCacheStats
+    todos: TodoCacheStats
+
+
+@router.get("", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def get_request_metrics():
+    # Prometheus text exposition format, for a scraper rather than a person
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK, response_model=PoolMetricsResponse)
+async def get_pool_metrics():
+    return pool_status()
+
+
+@router.get("/caches", status_code=status.HTTP_200_OK, response_model=CacheMetricsResponse)
+async def get_cache_metrics():
+    return {"tokens": token_cache.stats(), "todos": todo_cache.stats()}
+
+
+@router.get("/events", status_code=status.HTTP_200_OK, response_model=EventMetricsResponse)
+async def get_event_metrics():
+    return event_hub.stats()
@@ -1,32 +1,52 @@
-from typing import Annotated, Optional
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Optional, Literal, AsyncIterator
 
-from fastapi import status, HTTPException, Path, APIRouter, Request
+from fastapi import status, HTTPException, Path, APIRouter, Request, Query, Response
 from fastapi.params import Depends
+from markupsafe import Markup
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-from starlette.responses import RedirectResponse
-from starlette.templating import Jinja2Templates
-
-from .auth import current_user_dependency, get_current_user
-from ..database import SessionLocal
-from ..models import Todos
+from sqlalchemy import select, tuple_, insert, update, func, case, literal, RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import RedirectResponse, HTMLResponse, StreamingResponse
+
+from .auth import current_user_dependency, get_current_user, optional_oauth2_scheme
+from ..cache import todo_cache
+from ..conditional import weak_etag, check_conditional
+from ..conditional import as_utc
+from ..config import env_int, env_float
+from ..database import get_db
+from ..events import event_hub
+from ..models import Todos, TodoCounters, utcnow
+from ..pagination import encode_cursor, decode_cursor
+from ..search import build_search_query, search_terms
+from ..templating import get_templates, stream_template
+
+TODOS_PAGE_SIZE_DEFAULT = env_int("TODOS_PAGE_SIZE_DEFAULT", 100)
+TODOS_PAGE_SIZE_MAX = env_int("TODOS_PAGE_SIZE_MAX", 500)
+TODOS_BULK_MAX_ITEMS = env_int("TODOS_BULK_MAX_ITEMS", 1000)
+TODOS_STREAM_KEEPALIVE_SECONDS = env_float("TODOS_STREAM_KEEPALIVE_SECONDS", 15)
+TODOS_STREAM_RETRY_MS = env_int("TODOS_STREAM_RETRY_MS", 3000)
+# Changes newer than this are held back a sync, so a write that commits late can't land behind a client's token
+TODOS_SYNC_SETTLE_SECONDS = env_float("TODOS_SYNC_SETTLE_SECONDS", 2)
+TODOS_TOMBSTONE_RETENTION_DAYS = env_int("TODOS_TOMBSTONE_RETENTION_DAYS", 30)
+# Up to this many todos the page's rendered rows are cached; a longer list is rendered as it streams instead
+TODOS_PAGE_CACHE_MAX_ROWS = env_int("TODOS_PAGE_CACHE_MAX_ROWS", 200)
+
+# Read paths select these columns into plain row mappings instead of hydrating ORM instances
+TODO_COLUMNS = (Todos.id, Todos.user_id, Todos.title, Todos.description, Todos.priority, Todos.completed,
+                Todos.updated_at)
+TODO_IS_LIVE = Todos.deleted_at.is_(None)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 router = APIRouter(
     prefix="/todos",
     tags=["todos"]
 )
-templates = Jinja2Templates(directory="app/templates")
-
-
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 
 class TodoRequest(BaseModel):
@@ -48,92 +68,418 @@ class TodoRequest(BaseModel):
     }
 
 
+class TodoBulkUpdateRequest(TodoRequest):
+    id: int = Field(gt=0)
+
+
+class TodoResponse(BaseModel):
+    id: int
+    user_id: int
+    title: Optional[str]
+    description: Optional[str]
+    priority: Optional[int]
+    completed: Optional[bool]
+    updated_at: datetime
+
+
+class TodoChangesResponse(BaseModel):
+    todos: list[TodoResponse]
+    deleted_ids: list[int]
+    sync_token: str
+    has_more: bool
+
+
+class TodoStatsResponse(BaseModel):
+    total: int
+    completed: int
+    open: int
+    open_by_priority: dict[int, int]
+
+
+class StatusResponse(BaseModel):
+    status: str
+
+
+class TodoBulkResult(BaseModel):
+    id: int
+    status: Literal["created", "updated", "deleted", "not_found"]
+
+
+def check_batch_size(items: list):
+    if len(items) > TODOS_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"A batch can contain at most {TODOS_BULK_MAX_ITEMS} items")
+
+
+def serialize_todo(row: RowMapping) -> dict:
+    # Cached entries are plain JSON data so any cache backend can hold them
+    todo = dict(row)
+    todo["updated_at"] = todo["updated_at"].isoformat()
+    return todo
+
+
+async def get_todos_etag(db: AsyncSession, user_id: int, generation: str) -> str:
+    # Deletes leave a tombstone with a fresh updated_at, so the newest one covers every kind of write. The
+    # generation must be taken before the query: an ETag computed before a write that lands under the generation
+    # after it would answer If-None-Match with a false 304
+    etag = await todo_cache.get(user_id, "etag", generation)
+    if etag is None:
+        count, last_updated = (await db.execute(select(func.count(Todos.id), func.max(Todos.updated_at))
+                                                .where(Todos.user_id == user_id))).one()
+        etag = weak_etag(user_id, count, last_updated)
+        await todo_cache.set(user_id, "etag", etag, generation)
+    return etag
+
+
+async def get_cached_todo(db: AsyncSession, user_id: int, todo_id: int) -> Optional[dict]:
+    generation = await todo_cache.generation(user_id)
+    todo = await todo_cache.get(user_id, f"todo:{todo_id}", generation)
+    if todo is None:
+        result = await db.execute(select(*TODO_COLUMNS).where(Todos.id == todo_id, Todos.user_id == user_id,
+                                                               TODO_IS_LIVE))
+        row = result.mappings().first()
+        if row is None:
+            return None
+        todo = serialize_todo(row)
+        await todo_cache.set(user_id, f"todo:{todo_id}", todo, generation)
+    return todo
+
+
+async def todos_changed(user_id: int, event_type: str, todo_ids: list[int]):
+    # Called once the write has committed
+    await todo_cache.invalidate(user_id)
+    await event_hub.publish(user_id, event_type, todo_ids)
+
+
+async def get_stream_user(request: Request, token: Annotated[Optional[str], Depends(optional_oauth2_scheme)]):
+    # EventSource cannot send an Authorization header, so the browser UI authenticates with its cookie
+    return await get_current_user(token or request.cookies.get("access_token"))
+
+
+async def stream_events(user_id: int) -> AsyncIterator[str]:
+    # Subscribes on the first iteration, so a client gone before the stream starts leaves nothing behind
+    subscription = event_hub.subscribe(user_id)
+    try:
+        yield f"retry: {TODOS_STREAM_RETRY_MS}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=TODOS_STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment lines keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+def encode_sync_token(updated_at: datetime, todo_id: int) -> str:
+    return encode_cursor((as_utc(updated_at) - EPOCH) // timedelta(microseconds=1), todo_id)
+
+
+def decode_sync_token(token: str) -> tuple[datetime, int]:
+    # A well-formed token can still carry a timestamp datetime can't hold or an id no database column can
+    try:
+        microseconds, todo_id = decode_cursor(token, 2)
+        if not 0 <= todo_id < 2 ** 63:
+            raise ValueError(todo_id)
+        return EPOCH + timedelta(microseconds=microseconds), todo_id
+    except (HTTPException, OverflowError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token")
+
+
+async def fetch_todo_stats(db: AsyncSession, user_id: Optional[int] = None) -> dict:
+    # Reads the counter rows the triggers maintain, never the todos themselves
+    query = (select(TodoCounters.priority, TodoCounters.completed, func.sum(TodoCounters.count))
+             .group_by(TodoCounters.priority, TodoCounters.completed))
+    if user_id is not None:
+        query = query.where(TodoCounters.user_id == user_id)
+    stats = {"total": 0, "completed": 0, "open": 0, "open_by_priority": dict.fromkeys(range(1, 6), 0)}
+    for priority, completed, count in (await db.execute(query)).all():
+        stats["total"] += count
+        if completed:
+            stats["completed"] += count
+        else:
+            stats["open"] += count
+            stats["open_by_priority"][priority] = stats["open_by_priority"].get(priority, 0) + count
+    return stats
+
+
 def redirect_to_login():
     redirect_response = RedirectResponse(url="/auth/login-page", status_code=status.HTTP_302_FOUND)
     redirect_response.delete_cookie("access_token")
     return redirect_response
 
 
-@router.get("/todo-page")
+@router.get("/todo-page", response_class=HTMLResponse)
 async def render_todo_page(request: Request, db: db_dependency):
     try:
         current_user = await get_current_user(request.cookies.get("access_token"))
         if not current_user:
             return redirect_to_login()
-        todos = db.query(Todos).where(Todos.user_id == current_user["user_id"]).all()
-
-        return templates.TemplateResponse("todo.html",
-                                          context={"request": request, "todos": todos, "user": current_user})
+        # The rendered rows, cached under the user's generation so any write to their todos drops them
+        generation = await todo_cache.generation(current_user["user_id"])
+        rows = await todo_cache.get(current_user["user_id"], "page-rows", generation)
+        if rows is not None:
+            pieces = [rows]
+        else:
+            result = await db.execute(select(*TODO_COLUMNS).where(Todos.user_id == current_user["user_id"],
+                                                                   TODO_IS_LIVE))
+            todos = [serialize_todo(row) for row in result.mappings()]
+            rows_template = get_templates().get_template("todo-rows.html")
+            if len(todos) <= TODOS_PAGE_CACHE_MAX_ROWS:
+                pieces = [rows_template.render(todos=todos)]
+                await todo_cache.set(current_user["user_id"], "page-rows", pieces[0], generation)
+            else:
+                pieces = rows_template.generate(todos=todos)
+
+        return StreamingResponse(stream_template("todo.html", {"request": request, "rows": map(Markup, pieces),
+                                                               "user": current_user}), media_type="text/html")
     except:
         return redirect_to_login()
 
 
-@router.get("/edit-todo-page/{todo_id}")
+@router.get("/edit-todo-page/{todo_id}", response_class=HTMLResponse)
 async def render_todo_page(request: Request, db: db_dependency, todo_id: int = Path(gt=0)):
     try:
         current_user = await get_current_user(request.cookies.get("access_token"))
         if not current_user:
             return redirect_to_login()
-        todo = db.query(Todos).where(Todos.user_id == current_user["user_id"] and Todos.id == todo_id).first()
+        todo = await get_cached_todo(db, current_user["user_id"], todo_id)
 
-        return templates.TemplateResponse("edit-todo.html",
+        return get_templates().TemplateResponse("edit-todo.html",
                                           context={"request": request, "todo": todo, "user": current_user})
     except:
         return redirect_to_login()
 
 
-@router.get("/add-todo-page")
+@router.get("/add-todo-page", response_class=HTMLResponse)
 async def render_todo_page(request: Request):
     try:
         current_user = await get_current_user(request.cookies.get("access_token"))
         if not current_user:
             return redirect_to_login()
 
-        return templates.TemplateResponse("add-todo.html", context={"request": request, "user": current_user})
+        return get_templates().TemplateResponse("add-todo.html", context={"request": request, "user": current_user})
     except:
         return redirect_to_login()
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_todos(db: db_dependency, current_user: current_user_dependency):
-    return db.query(Todos).where(Todos.user_id == current_user["user_id"]).all()
+@router.get("/stream", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+async def stream_todo_events(current_user: Annotated[dict, Depends(get_stream_user)]):
+    return StreamingResponse(stream_events(current_user["user_id"]), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[TodoResponse])
+async def get_todos(db: db_dependency, current_user: current_user_dependency, request: Request, response: Response,
+                    limit: int = Query(default=TODOS_PAGE_SIZE_DEFAULT, gt=0, le=TODOS_PAGE_SIZE_MAX),
+                    cursor: Optional[str] = None,
+                    sort: Literal["id", "priority"] = "id",
+                    completed: Optional[bool] = None,
+                    priority_min: Optional[int] = Query(default=None, gt=0, lt=6),
+                    priority_max: Optional[int] = Query(default=None, gt=0, lt=6)):
+    # One generation for the ETag and the page, so both describe the same state of the user's todos
+    generation = await todo_cache.generation(current_user["user_id"])
+    not_modified = check_conditional(request, response,
+                                     await get_todos_etag(db, current_user["user_id"], generation))
+    if not_modified is not None:
+        return not_modified
+
+    cache_key = f"list:{sort}:{limit}:{cursor}:{completed}:{priority_min}:{priority_max}"
+    page = await todo_cache.get(current_user["user_id"], cache_key, generation)
+    if page is None:
+        page = await fetch_todos_page(db, current_user["user_id"], limit, cursor, sort, completed, priority_min,
+                                      priority_max)
+        await todo_cache.set(current_user["user_id"], cache_key, page, generation)
+    if page["next_cursor"] is not None:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["todos"]
+
+
+async def fetch_todos_page(db: AsyncSession, user_id: int, limit: int, cursor: Optional[str], sort: str,
+                           completed: Optional[bool], priority_min: Optional[int], priority_max: Optional[int]) -> dict:
+    sort_columns = (Todos.id,) if sort == "id" else (Todos.priority, Todos.id)
+    query = select(*TODO_COLUMNS).where(Todos.user_id == user_id, TODO_IS_LIVE)
+    if completed is not None:
+        query = query.where(Todos.completed == completed)
+    if priority_min is not None:
+        query = query.where(Todos.priority >= priority_min)
+    if priority_max is not None:
+        query = query.where(Todos.priority <= priority_max)
+    if cursor is not None:
+        query = query.where(tuple_(*sort_columns) > tuple_(*decode_cursor(cursor, len(sort_columns))))
+
+    # One extra row tells us whether there is a next page without a COUNT(*)
+    result = await db.execute(query.order_by(*sort_columns).limit(limit + 1))
+    rows = result.mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(last[column.key] for column in sort_columns))
+    return {"todos": [serialize_todo(row) for row in rows], "next_cursor": next_cursor}
+
+
+@router.get("/changes", status_code=status.HTTP_200_OK, response_model=TodoChangesResponse)
+async def get_todo_changes(db: db_dependency, current_user: current_user_dependency, since: Optional[str] = None,
+                           limit: int = Query(default=TODOS_PAGE_SIZE_DEFAULT, gt=0, le=TODOS_PAGE_SIZE_MAX)):
+    now = utcnow()
+    settled = now - timedelta(seconds=TODOS_SYNC_SETTLE_SECONDS)
+    query = (select(*TODO_COLUMNS, Todos.deleted_at)
+             .where(Todos.user_id == current_user["user_id"], Todos.updated_at <= settled))
+    if since is None:
+        # A first sync has nothing to delete
+        query = query.where(TODO_IS_LIVE)
+    else:
+        since_updated_at, since_id = decode_sync_token(since)
+        if since_updated_at < now - timedelta(days=TODOS_TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=status.HTTP_410_GONE,
+                                detail="Sync token is older than the tombstone retention, start a full sync")
+        query = query.where(tuple_(Todos.updated_at, Todos.id) > tuple_(since_updated_at, since_id))
+
+    result = await db.execute(query.order_by(Todos.updated_at, Todos.id).limit(limit + 1))
+    rows = result.mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        sync_token = encode_sync_token(rows[-1]["updated_at"], rows[-1]["id"])
+    else:
+        # Everything up to `settled` has been sent, so an idle client's token moves on instead of aging into a 410
+        position = (settled, 0) if since is None else max((since_updated_at, since_id), (settled, 0))
+        sync_token = encode_sync_token(*position)
+    return {
+        "todos": [row for row in rows if row["deleted_at"] is None],
+        "deleted_ids": [row["id"] for row in rows if row["deleted_at"] is not None],
+        "sync_token": sync_token,
+        "has_more": has_more,
+    }
 
 
-@router.get("/{todo_id}", status_code=status.HTTP_200_OK)
-async def get_todo_by_id(db: db_dependency, current_user: current_user_dependency, todo_id: int = Path(gt=0)):
-    todo = db.query(Todos).where(Todos.id == todo_id and Todos.user_id == current_user["user_id"]).first()
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=list[TodoResponse])
+async def search_todos(db: db_dependency, current_user: current_user_dependency, response: Response,
+                       q: str = Query(min_length=1, max_length=200),
+                       limit: int = Query(default=TODOS_PAGE_SIZE_DEFAULT, gt=0, le=TODOS_PAGE_SIZE_MAX),
+                       cursor: Optional[str] = None):
+    terms = search_terms(q)
+    if not terms:
+        return []
+    # Results are ordered by relevance, which has no stable keyset, so the cursor carries an offset
+    offset = decode_cursor(cursor, 1, minimum=0)[0] if cursor is not None else 0
+    query = (build_search_query(db.get_bind().dialect.name, TODO_COLUMNS, terms)
+             .where(Todos.user_id == current_user["user_id"], TODO_IS_LIVE))
+    result = await db.execute(query.limit(limit + 1).offset(offset))
+    rows = result.mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(offset + limit)
+    return rows
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsResponse)
+async def get_todo_stats(db: db_dependency, current_user: current_user_dependency):
+    return await fetch_todo_stats(db, current_user["user_id"])
+
+
+@router.get("/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse)
+async def get_todo_by_id(db: db_dependency, current_user: current_user_dependency, request: Request,
+                         response: Response, todo_id: int = Path(gt=0)):
+    todo = await get_cached_todo(db, current_user["user_id"], todo_id)
     if todo is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+    not_modified = check_conditional(request, response, weak_etag(todo["id"], todo["updated_at"]),
+                                     datetime.fromisoformat(todo["updated_at"]))
+    if not_modified is not None:
+        return not_modified
     return todo
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED)
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=StatusResponse)
 async def create_todo(db: db_dependency, current_user: current_user_dependency, todo_request: TodoRequest):
     todo = Todos(**todo_request.model_dump(), user_id=current_user["user_id"])
     db.add(todo)
-    db.commit()
+    await db.commit()
+    await todos_changed(current_user["user_id"], "created", [todo.id])
     return {"status": "The new todo was created"}
 
 
-@router.put("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, response_model=list[TodoBulkResult])
+async def create_todos(db: db_dependency, current_user: current_user_dependency, todo_requests: list[TodoRequest]):
+    check_batch_size(todo_requests)
+    if not todo_requests:
+        return []
+    rows = [{**todo_request.model_dump(), "user_id": current_user["user_id"]} for todo_request in todo_requests]
+    # SQLite can only return ids in parameter order by inserting row by row, but it numbers the rows of a batch
+    # in order anyway, so it gets the batched insert and sorted ids
+    in_order = db.get_bind().dialect.name != "sqlite"
+    result = await db.execute(insert(Todos).returning(Todos.id, sort_by_parameter_order=in_order), rows)
+    todo_ids = result.scalars().all() if in_order else sorted(result.scalars().all())
+    await db.commit()
+    await todos_changed(current_user["user_id"], "created", list(todo_ids))
+    return [{"id": todo_id, "status": "created"} for todo_id in todo_ids]
+
+
+@router.patch("/bulk", status_code=status.HTTP_200_OK, response_model=list[TodoBulkResult])
+async def update_todos(db: db_dependency, current_user: current_user_dependency,
+                       todo_requests: list[TodoBulkUpdateRequest]):
+    check_batch_size(todo_requests)
+    if not todo_requests:
+        return []
+    rows = {todo_request.id: todo_request.model_dump(exclude={"id"}) for todo_request in todo_requests}
+    # One UPDATE ... RETURNING picking each row's values by id, so only rows it actually changed count as updated
+    values = {name: case({todo_id: literal(row[name], Todos.__table__.c[name].type) for todo_id, row in rows.items()},
+                         value=Todos.id)
+              for name in TodoRequest.model_fields}
+    result = await db.execute(update(Todos)
+                              .where(Todos.user_id == current_user["user_id"], Todos.id.in_(rows), TODO_IS_LIVE)
+                              .values(values)
+                              .returning(Todos.id)
+                              .execution_options(synchronize_session=False))
+    updated_ids = set(result.scalars().all())
+    await db.commit()
+    if updated_ids:
+        await todos_changed(current_user["user_id"], "updated", sorted(updated_ids))
+    return [{"id": todo_request.id, "status": "updated" if todo_request.id in updated_ids else "not_found"}
+            for todo_request in todo_requests]
+
+
+@router.delete("/bulk", status_code=status.HTTP_200_OK, response_model=list[TodoBulkResult])
+async def delete_todos(db: db_dependency, current_user: current_user_dependency, todo_ids: list[int]):
+    check_batch_size(todo_ids)
+    result = await db.execute(update(Todos)
+                              .where(Todos.user_id == current_user["user_id"], Todos.id.in_(todo_ids), TODO_IS_LIVE)
+                              .values(deleted_at=utcnow())
+                              .returning(Todos.id)
+                              .execution_options(synchronize_session=False))
+    deleted_ids = set(result.scalars().all())
+    await db.commit()
+    if deleted_ids:
+        await todos_changed(current_user["user_id"], "deleted", sorted(deleted_ids))
+    return [{"id": todo_id, "status": "deleted" if todo_id in deleted_ids else "not_found"} for todo_id in todo_ids]
+
+
+@router.put("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def update_todo(db: db_dependency, current_user: current_user_dependency, todo_request: TodoRequest,
                       todo_id: int = Path(gt=0)):
-    todo = db.query(Todos).where(Todos.id == todo_id and Todos.user_id == current_user["user_id"]).first()
-    if todo is None:
+    updated_id = await db.scalar(update(Todos)
+                                 .where(Todos.id == todo_id, Todos.user_id == current_user["user_id"], TODO_IS_LIVE)
+                                 .values(**todo_request.model_dump())
+                                 .returning(Todos.id)
+                                 .execution_options(synchronize_session=False))
+    if updated_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+    await db.commit()
+    await todos_changed(current_user["user_id"], "updated", [updated_id])
 
-    todo.title = todo_request.title
-    todo.description = todo_request.description
-    todo.priority = todo_request.priority
-    todo.completed = todo_request.completed
-    db.add(todo)
-    db.commit()
 
-
-@router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def delete_todo(db: db_dependency, current_user: current_user_dependency, todo_id: int = Path(gt=0)):
-    todo = db.query(Todos).where(Todos.id == todo_id and Todos.user_id == current_user["user_id"]).first()
-    if todo is None:
+    deleted_id = await db.scalar(update(Todos)
+                                 .where(Todos.id == todo_id, Todos.user_id == current_user["user_id"], TODO_IS_LIVE)
+                                 .values(deleted_at=utcnow())
+                                 .returning(Todos.id)
+                                 .execution_options(synchronize_session=False))
+    if deleted_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
-    db.delete(todo)
-    db.commit()
+    await db.commit()
+    await todos_changed(current_user["user_id"], "deleted", [deleted_id])
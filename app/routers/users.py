@@ -1,13 +1,16 @@
 from typing import Annotated
 
-from fastapi import status, APIRouter, HTTPException
+from fastapi import status, APIRouter, HTTPException, Request, Response
 from fastapi.params import Depends, Path
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .auth import current_user_dependency, bcrypt_context
-from ..database import SessionLocal
+from .auth import current_user_dependency
+from ..conditional import weak_etag, check_conditional
+from ..database import get_db
 from ..models import Users
+from ..passwords import hash_password, verify_password
 
 router = APIRouter(
     prefix="/users",
@@ -15,15 +18,7 @@ router = APIRouter(
 )
 
 
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 
 class UserInfoResponse(BaseModel):
@@ -39,46 +34,57 @@ class UserInfoResponse(BaseModel):
     }
 
 
+class UserResponse(BaseModel):
+    user: UserInfoResponse
+
+
 class UserChangePasswordRequest(BaseModel):
     old_password: str
     new_password: str
     confirm_new_password: str
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def get_user_info(current_user: current_user_dependency, db: db_dependency):
-    user_model = db.query(Users).where(Users.username == current_user["username"]).first()
+@router.get("/", status_code=status.HTTP_200_OK, response_model=UserResponse)
+async def get_user_info(current_user: current_user_dependency, db: db_dependency, request: Request,
+                        response: Response):
+    user_model = await db.scalar(select(Users).where(Users.username == current_user["username"]))
     if user_model is None or not user_model.is_active:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot find your account details")
+    not_modified = check_conditional(request, response, weak_etag(user_model.id, user_model.updated_at),
+                                     user_model.updated_at)
+    if not_modified is not None:
+        return not_modified
 
-    return {"user": UserInfoResponse.model_validate(user_model).model_dump(exclude={"hashed_password"})}
+    return {"user": user_model}
 
 
-@router.put("/password-change", status_code=status.HTTP_204_NO_CONTENT)
+@router.put("/password-change", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def change_user_password(current_user: current_user_dependency, db: db_dependency,
                                user_info: UserChangePasswordRequest):
-    user_model = db.query(Users).where(Users.username == current_user["username"]).first()
+    user_model = await db.scalar(select(Users).where(Users.username == current_user["username"]))
     if not user_model or not user_model.is_active:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot find your account details")
+    # End the read transaction so the pooled connection isn't held while passwords are hashed
+    await db.commit()
 
-    if not bcrypt_context.verify(user_info.old_password, user_model.hashed_password):
+    if not await verify_password(user_info.old_password, user_model.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect old password")
 
     if user_info.new_password != user_info.confirm_new_password:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Confirm new password must match new password")
 
-    user_model.hashed_password = bcrypt_context.hash(user_info.new_password)
+    user_model.hashed_password = await hash_password(user_info.new_password)
     db.add(user_model)
-    db.commit()
+    await db.commit()
 
 
-@router.put("/phone-number/{new_phone_number}", status_code=status.HTTP_204_NO_CONTENT)
+@router.put("/phone-number/{new_phone_number}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def change_phone_number(current_user: current_user_dependency, db: db_dependency,
                               new_phone_number: str = Path(min_length=10, max_length=10)):
-    user_model = db.query(Users).where(Users.id == current_user["user_id"]).first()
+    user_model = await db.scalar(select(Users).where(Users.id == current_user["user_id"]))
     if user_model.phone_number == new_phone_number:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Your new phone number is already taken")
     user_model.phone_number = new_phone_number
     db.add(user_model)
-    db.commit()
+    await db.commit()
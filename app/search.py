@@ -0,0 +1,44 @@
+import re
+
+from sqlalchemy import Select, select, func, literal_column, table, column
+
+from .models import Todos
+
+SEARCH_MAX_TERMS = 8
+
+todos_fts = table("todos_fts", column("rowid"))
+
+
+def search_terms(q: str) -> list[str]:
+    # Only word characters reach the query, so user input can never be parsed as tsquery or FTS5 syntax
+    return re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+
+
+def postgres_search(columns, terms: list[str]) -> Select:
+    ts_query = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+    search_vector = literal_column('"Todos".search_vector')
+    rank = func.ts_rank_cd(search_vector, ts_query)
+    return (select(*columns)
+            .where(search_vector.op("@@")(ts_query))
+            .order_by(rank.desc(), Todos.id.desc()))
+
+
+def sqlite_search(columns, terms: list[str]) -> Select:
+    match = " ".join(f'"{term}"*' for term in terms)
+    # bm25 scores better matches lower; title hits count double
+    rank = func.bm25(literal_column("todos_fts"), 2.0, 1.0)
+    return (select(*columns)
+            .join(todos_fts, todos_fts.c.rowid == Todos.id)
+            .where(literal_column("todos_fts").op("MATCH")(match))
+            .order_by(rank, Todos.id.desc()))
+
+
+SEARCH_BUILDERS = {
+    "postgresql": postgres_search,
+    "sqlite": sqlite_search,
+}
+
+
+def build_search_query(dialect_name: str, columns, terms: list[str]) -> Select:
+    """Ranked prefix search over title and description; every term must match."""
+    return SEARCH_BUILDERS[dialect_name](columns, terms)
@@ -220,6 +220,20 @@ if (registerForm) {
     });
 }
 
+// Live updates from other tabs and devices
+const todoTable = document.getElementById('todoTable');
+if (todoTable && window.EventSource) {
+    const todoEvents = new EventSource('/todos/stream');
+    let reloadTimer = null;
+    const reloadTodos = function () {
+        // Coalesce a burst of events, e.g. from a bulk update, into one reload
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(() => window.location.reload(), 250);
+    };
+    ['created', 'updated', 'deleted', 'resync'].forEach(type => todoEvents.addEventListener(type, reloadTodos));
+    window.addEventListener('beforeunload', () => todoEvents.close());
+}
+
 
 // Helper function to get a cookie by name
 function getCookie(name) {
@@ -0,0 +1,71 @@
+import functools
+import os
+import tempfile
+from typing import TYPE_CHECKING, Iterator
+
+from .assets import static_url
+from .config import env_int, env_bool
+
+if TYPE_CHECKING:
+    from markupsafe import Markup
+    from starlette.templating import Jinja2Templates
+
+TEMPLATES_DIRECTORY = "app/templates"
+# Compiled templates are written here and shared by every worker, so only the first process to see a template
+# compiles it; point it at a directory baked into the image with `python -m app.manage compile-templates`
+TEMPLATES_BYTECODE_DIR = os.getenv("TEMPLATES_BYTECODE_DIR", os.path.join(tempfile.gettempdir(), "todo-app-jinja"))
+# Checks every template's mtime on each render; only worth it while editing templates
+TEMPLATES_AUTO_RELOAD = env_bool("TEMPLATES_AUTO_RELOAD", False)
+TEMPLATES_STREAM_CHUNK_SIZE = env_int("TEMPLATES_STREAM_CHUNK_SIZE", 16384)
+
+
+@functools.cache
+def get_templates() -> "Jinja2Templates":
+    # Jinja is imported and its environment built on the first page render, not when the app is imported
+    from jinja2 import FileSystemBytecodeCache
+    from starlette.templating import Jinja2Templates
+
+    templates = Jinja2Templates(directory=TEMPLATES_DIRECTORY)
+    templates.env.auto_reload = TEMPLATES_AUTO_RELOAD
+    if TEMPLATES_BYTECODE_DIR:
+        os.makedirs(TEMPLATES_BYTECODE_DIR, exist_ok=True)
+        templates.env.bytecode_cache = FileSystemBytecodeCache(TEMPLATES_BYTECODE_DIR)
+    templates.env.globals["fragment"] = render_fragment
+    templates.env.globals["static_url"] = static_url
+    return templates
+
+
+@functools.lru_cache(maxsize=64)
+def _render_fragment(name: str, context: tuple) -> "Markup":
+    from markupsafe import Markup
+
+    return Markup(get_templates().get_template(name).render(dict(context)))
+
+
+def render_fragment(name: str, **context) -> "Markup":
+    """Renders a template that depends only on a few hashable values once per process and per set of values."""
+    if TEMPLATES_AUTO_RELOAD:
+        _render_fragment.cache_clear()
+    return _render_fragment(name, tuple(sorted(context.items())))
+
+
+def compile_templates() -> int:
+    # Loading a template goes through the bytecode cache, so this leaves every template compiled on disk
+    environment = get_templates().env
+    names = environment.list_templates(extensions=["html"])
+    for name in names:
+        environment.get_template(name)
+    return len(names)
+
+
+def stream_template(name: str, context: dict) -> Iterator[str]:
+    """Renders a template piece by piece, in chunks big enough that each one is worth a send."""
+    buffer, size = [], 0
+    for piece in get_templates().get_template(name).generate(context):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= TEMPLATES_STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
@@ -1,14 +1,20 @@
+import csv
+import io
+import json
+
 from fastapi import status
 
 from .utils import *
 from ..main import app
-from ..routers.admin import get_db
+from ..pagination import encode_cursor
+from ..routers.admin import get_db, get_session_factory
 from ..routers.auth import get_current_user
 
 
 @pytest.fixture(autouse=True)
 def override_dependencies():
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
     app.dependency_overrides[get_current_user] = override_get_current_admin
     yield
     app.dependency_overrides.clear()
@@ -19,6 +25,83 @@ def test_get_todos_authenticated(mock_data):
     assert response.status_code == status.HTTP_200_OK
 
 
+@pytest.fixture
+def many_todos(mock_data):
+    with TestSessionLocal() as db:
+        db.add_all([Todos(user_id=1 if index % 2 else 2, title=f"Todo {index}", description="Exported, todo",
+                          priority=index % 5 + 1) for index in range(1, 8)])
+        db.commit()
+
+
+def test_get_todos_paginated(many_todos):
+    # Act
+    first_page = client.get("/todos/admin/", params={"limit": 5})
+    last_page = client.get("/todos/admin/", params={"limit": 5, "cursor": first_page.headers["X-Next-Cursor"]})
+
+    # Assert
+    assert [todo["id"] for todo in first_page.json() + last_page.json()] == list(range(1, 9))
+    assert "X-Next-Cursor" not in last_page.headers
+
+
+def test_get_todos_oversized_cursor(mock_data):
+    response = client.get("/todos/admin/", params={"cursor": encode_cursor(2 ** 70)})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_todos_filtered_by_user(many_todos):
+    response = client.get("/todos/admin/", params={"user_id": 2})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 3
+    assert all(todo["user_id"] == 2 for todo in response.json())
+
+
+def test_export_todos_ndjson(many_todos, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.routers.admin.ADMIN_EXPORT_BATCH_SIZE", 3)
+
+    # Act
+    response = client.get("/todos/admin/export")
+
+    # Assert
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [row["id"] for row in rows] == list(range(1, 9))
+    assert rows[0]["title"] == "Todo Test"
+
+
+def test_export_todos_csv_for_one_user(many_todos):
+    # Act
+    response = client.get("/todos/admin/export", params={"format": "csv", "user_id": 2})
+
+    # Assert
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-disposition"] == 'attachment; filename="todos.csv"'
+    assert len(rows) == 3
+    assert all(row["user_id"] == "2" and row["description"] == "Exported, todo" for row in rows)
+
+
+def test_export_todos_requires_admin(mock_data):
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    response = client.get("/todos/admin/export")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_get_todo_stats(many_todos):
+    # Arrange
+    client.delete("/todos/admin/3")
+
+    # Act
+    response = client.get("/todos/admin/stats")
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"total": 7, "completed": 0, "open": 7,
+                               "open_by_priority": {"1": 1, "2": 2, "3": 1, "4": 1, "5": 2}}
+
+
 def test_get_todo_by_id(mock_data):
     # Arrange
     todo = mock_data["todo"]
@@ -28,7 +111,8 @@ def test_get_todo_by_id(mock_data):
         "title": todo.title,
         "description": todo.description,
         "priority": todo.priority,
-        "completed": todo.completed
+        "completed": todo.completed,
+        "updated_at": todo.updated_at.isoformat()
     }
 
     # Act
@@ -46,9 +130,16 @@ def test_delete_todo_by_id(mock_data):
     db = TestSessionLocal()
 
     # Act
-    delete_response = client.delete(f"/todos/admin/{todo.id}")
+    with assert_query_count(1):
+        delete_response = client.delete(f"/todos/admin/{todo.id}")
     todo_model = db.query(Todos).where(Todos.id == todo.id).first()
 
     # Assert
     assert delete_response.status_code == status.HTTP_204_NO_CONTENT
-    assert todo_model is None
+    assert todo_model.deleted_at is not None
+    assert client.get(f"/todos/admin/{todo.id}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_todo_by_id_not_found(mock_data):
+    response = client.delete("/todos/admin/111111111")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
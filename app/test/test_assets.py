@@ -0,0 +1,99 @@
+import gzip
+
+import brotli
+from fastapi import status
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from .utils import *
+from ..assets import PrecompressedStaticFiles, build_assets, accepted_encodings, IMMUTABLE_CACHE_CONTROL
+
+
+@pytest.fixture
+def built_assets(tmp_path):
+    source = tmp_path / "static"
+    (source / "js").mkdir(parents=True)
+    (source / "js" / "app.js").write_text("function greet(name) {\n    // Say hello\n    return 'Hello ' + name;\n}\n"
+                                          * 100)
+    (source / "css").mkdir()
+    (source / "css" / "tiny.css").write_text("body { margin: 0; }\n")
+    output = tmp_path / "static-build"
+    manifest = build_assets(str(source), str(output))
+    assets_client = TestClient(Starlette(routes=[
+        Mount("/static", PrecompressedStaticFiles(directory=str(output)), name="static"),
+    ]))
+    return manifest, output, assets_client
+
+
+def test_build_assets_fingerprints_minifies_and_compresses(built_assets):
+    # Arrange
+    manifest, output, _ = built_assets
+
+    # Act
+    hashed = manifest["js/app.js"]
+    minified = (output / hashed).read_bytes()
+
+    # Assert
+    assert hashed.startswith("js/app.") and hashed.endswith(".js") and hashed != "js/app.js"
+    assert b"Say hello" not in minified
+    assert (output / "js/app.js").read_bytes() == minified
+    assert gzip.decompress((output / f"{hashed}.gz").read_bytes()) == minified
+    assert brotli.decompress((output / f"{hashed}.br").read_bytes()) == minified
+    # Too small to be worth compressing
+    assert not (output / f"{manifest['css/tiny.css']}.gz").exists()
+
+
+def test_serves_precompressed_variant(built_assets):
+    # Arrange
+    manifest, output, assets_client = built_assets
+
+    # Act
+    brotli_response = assets_client.get(f"/static/{manifest['js/app.js']}", headers={"Accept-Encoding": "gzip, br"})
+    gzip_response = assets_client.get(f"/static/{manifest['js/app.js']}", headers={"Accept-Encoding": "gzip"})
+    identity_response = assets_client.get(f"/static/{manifest['js/app.js']}", headers={"Accept-Encoding": "identity"})
+
+    # Assert
+    assert brotli_response.headers["content-encoding"] == "br"
+    assert gzip_response.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity_response.headers
+    for response in (brotli_response, gzip_response, identity_response):
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/javascript")
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == (output / manifest["js/app.js"]).read_bytes()
+
+
+def test_range_requests_get_the_plain_file(built_assets):
+    # Arrange
+    manifest, output, assets_client = built_assets
+
+    # Act
+    response = assets_client.get(f"/static/{manifest['js/app.js']}",
+                                 headers={"Accept-Encoding": "br, gzip", "Range": "bytes=0-99"})
+
+    # Assert
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert "content-encoding" not in response.headers
+    assert response.content == (output / manifest["js/app.js"]).read_bytes()[:100]
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_only_fingerprinted_files_are_immutable(built_assets):
+    # Arrange
+    manifest, _, assets_client = built_assets
+
+    # Act
+    fingerprinted = assets_client.get(f"/static/{manifest['css/tiny.css']}")
+    plain = assets_client.get("/static/css/tiny.css")
+    revalidated = assets_client.get("/static/css/tiny.css", headers={"If-None-Match": plain.headers["etag"]})
+
+    # Assert
+    assert fingerprinted.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert plain.headers["cache-control"] == "no-cache"
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0.8") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip") == {"gzip"}
+    assert accepted_encodings("") == set()
@@ -2,16 +2,21 @@ from datetime import timedelta
 
 from fastapi import status, HTTPException
 from jose import jwt
+from passlib.hash import bcrypt
 
 from .utils import *
 from ..main import app
 from ..routers.auth import ACCESS_TOKEN_EXPIRE_MINUTES, generate_access_token, SECRET_KEY, ALGORITHM, get_current_user
+from ..routers.auth import decode_access_token, token_cache
 from ..routers.auth import get_db
+from ..database import get_session_factory
+from ..passwords import password_needs_update
 
 
 @pytest.fixture(autouse=True)
 def override_dependencies():
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
     yield
     app.dependency_overrides.clear()
 
@@ -28,6 +33,26 @@ def test_login(mock_data):
     assert response.json()["access_token"]
 
 
+def test_login_upgrades_outdated_password_hash(mock_data):
+    # Arrange
+    outdated_hash = bcrypt.using(rounds=4).hash("12345aA@")
+    with TestSessionLocal() as db:
+        db.query(Users).where(Users.username == "johndoe123").update({"hashed_password": outdated_hash})
+        db.commit()
+    form_data = {"grant_type": "password", "username": "johndoe123", "password": "12345aA@"}
+
+    # Act
+    response = client.post("/auth/login", data=form_data)
+    with TestSessionLocal() as db:
+        new_hash = db.query(Users.hashed_password).where(Users.username == "johndoe123").scalar()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert password_needs_update(outdated_hash)
+    assert new_hash != outdated_hash
+    assert not password_needs_update(new_hash)
+
+
 def test_login_incorrect_password(mock_data):
     # Arrange
     form_data = {"grant_type": "password", "username": "johndoe123", "password": "12345aA@@"}
@@ -103,3 +128,40 @@ async def test_get_current_user_missing_payload():
 
     # Assert
     assert ex.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_verified_claims():
+    # Arrange
+    claims = {"sub": "cached123", "user_id": 7, "user_role": "user"}
+    access_token = generate_access_token(claims, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    hits = token_cache.hits
+
+    # Act
+    first = await get_current_user(access_token)
+    second = await get_current_user(access_token)
+
+    # Assert
+    assert first == second == {"username": "cached123", "user_id": 7, "user_role": "user"}
+    assert token_cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_expired_token():
+    # Arrange
+    claims = {"sub": "johndoe123", "user_id": 1, "user_role": "user"}
+    access_token = generate_access_token(claims, timedelta(minutes=-1))
+
+    # Act
+    with pytest.raises(HTTPException) as ex:
+        await get_current_user(access_token)
+
+    # Assert
+    assert ex.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_decode_access_token_backends_agree():
+    claims = {"sub": "johndoe123", "user_id": 1, "user_role": "user"}
+    access_token = generate_access_token(claims, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+    assert decode_access_token(access_token, backend="jose") == decode_access_token(access_token, backend="pyjwt")
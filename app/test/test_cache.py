@@ -0,0 +1,113 @@
+import pytest
+
+from ..cache import LRUCache, TodoCache, MemoryCacheBackend, SharedCacheBackend, LocalSharedStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache_hit_and_miss():
+    cache = LRUCache(maxsize=2)
+
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=5)
+
+    clock.now = 10
+
+    assert cache.get("short") is None
+    assert cache.get("default") == 1
+    clock.now = 61
+    assert cache.get("default") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_skips_already_expired_values():
+    cache = LRUCache(maxsize=10)
+
+    cache.set("a", 1, ttl=-1)
+
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemoryCacheBackend(maxsize=100), SharedCacheBackend(LocalSharedStore(), ttl=60)])
+async def test_todo_cache_invalidates_one_user(backend):
+    cache = TodoCache(backend)
+    await cache.set(1, "page", [{"id": 1, "title": "Mine"}], await cache.generation(1))
+    await cache.set(2, "page", [{"id": 2, "title": "Theirs"}], await cache.generation(2))
+
+    await cache.invalidate(1)
+
+    assert await cache.get(1, "page", await cache.generation(1)) is None
+    assert await cache.get(2, "page", await cache.generation(2)) == [{"id": 2, "title": "Theirs"}]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_todo_cache_entries_survive_losing_the_generation():
+    # An evicted generation must never bring older entries back
+    backend = MemoryCacheBackend(maxsize=100)
+    cache = TodoCache(backend)
+    await cache.set(1, "page", ["stale"], await cache.generation(1))
+
+    await backend.delete("todos:1:generation")
+
+    assert await cache.get(1, "page", await cache.generation(1)) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [MemoryCacheBackend(maxsize=100), SharedCacheBackend(LocalSharedStore(), ttl=60)])
+async def test_todo_cache_read_racing_a_write_stores_nothing_reachable(backend):
+    # A reader misses and queries the old rows, then a write commits and invalidates before the reader stores them
+    cache = TodoCache(backend)
+    generation = await cache.generation(1)
+    assert await cache.get(1, "page", generation) is None
+    await cache.invalidate(1)
+
+    await cache.set(1, "page", ["old"], generation)
+
+    assert await cache.get(1, "page", await cache.generation(1)) is None
+
+
+@pytest.mark.asyncio
+async def test_local_shared_store_expires_entries():
+    clock = FakeClock()
+    backend = SharedCacheBackend(LocalSharedStore(clock=clock), ttl=30)
+    await backend.set("a", {"id": 1})
+
+    assert await backend.get("a") == {"id": 1}
+    clock.now = 31
+    assert await backend.get("a") is None
@@ -0,0 +1,142 @@
+import asyncio
+import gzip
+import zlib
+
+from fastapi import status
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from .utils import *
+from ..compression import CompressionMiddleware, COMPRESSION_MINIMUM_SIZE
+from ..main import app
+from ..routers.auth import get_current_user
+from ..routers.todos import get_db
+
+LARGE_PAYLOAD = [{"id": index, "title": f"Todo {index}", "description": "Compress me", "priority": 3}
+                 for index in range(200)]
+CHUNKS = [b'{"id": 1, "title": "First"}\n' * 50, b'{"id": 2, "title": "Second"}\n' * 50]
+
+
+async def stream_chunks():
+    for chunk in CHUNKS:
+        yield chunk
+
+
+compressed_app = Starlette(routes=[
+    Route("/large", lambda request: JSONResponse(LARGE_PAYLOAD)),
+    Route("/small", lambda request: JSONResponse({"id": 1, "title": "x" * (COMPRESSION_MINIMUM_SIZE - 100)})),
+    Route("/image", lambda request: Response(b"\x89PNG" * 1000, media_type="image/png")),
+    Route("/precompressed", lambda request: Response(gzip.compress(b"x" * 2000), media_type="text/css",
+                                                      headers={"Content-Encoding": "gzip"})),
+    Route("/stream", lambda request: StreamingResponse(stream_chunks(), media_type="application/x-ndjson")),
+])
+compressed_app.add_middleware(CompressionMiddleware)
+compressed_client = TestClient(compressed_app)
+
+
+def test_compresses_large_responses():
+    # Act
+    brotli_response = compressed_client.get("/large", headers={"Accept-Encoding": "br, gzip"})
+    gzip_response = compressed_client.get("/large", headers={"Accept-Encoding": "gzip"})
+    identity_response = compressed_client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    # Assert
+    assert brotli_response.headers["content-encoding"] == "br"
+    assert gzip_response.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity_response.headers
+    assert brotli_response.headers["vary"] == "Accept-Encoding"
+    assert int(gzip_response.headers["content-length"]) < len(identity_response.content)
+    assert brotli_response.json() == gzip_response.json() == identity_response.json() == LARGE_PAYLOAD
+
+
+@pytest.mark.parametrize("path", ["/small", "/image", "/precompressed"])
+def test_leaves_small_binary_and_precompressed_responses_alone(path):
+    # Act
+    response = compressed_client.get(path, headers={"Accept-Encoding": "br"})
+
+    # Assert
+    assert response.headers.get("content-encoding") != "br"
+    assert "vary" not in response.headers
+
+
+def test_streaming_response_is_flushed_per_chunk():
+    # Arrange
+    messages = []
+    scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+             "query_string": b"", "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1",
+             "scheme": "http", "server": ("testserver", 80), "client": ("testclient", 50000)}
+
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    # Act
+    asyncio.run(compressed_app(scope, receive, send))
+    decompressor = zlib.decompressobj(31)
+    bodies = [decompressor.decompress(message["body"]) for message in messages[1:]]
+
+    # Assert
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Each chunk decodes as soon as it arrives, without waiting for the rest of the stream
+    assert bodies[:len(CHUNKS)] == CHUNKS
+    assert decompressor.eof
+
+
+def test_todos_list_is_compressed(mock_data):
+    # Arrange
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    with TestSessionLocal() as db:
+        db.add_all([Todos(user_id=1, title=f"Todo {index}", description="Compressed todo", priority=1,
+                          completed=False) for index in range(50)])
+        db.commit()
+
+    # Act
+    try:
+        response = client.get("/todos/", headers={"Accept-Encoding": "gzip"})
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 51
+
+
+def test_range_responses_are_not_compressed():
+    # Arrange
+    with open("app/static/js/bootstrap.js", "rb") as file:
+        identity = file.read()
+
+    # Act
+    response = client.get("/static/js/bootstrap.js", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-1999"})
+
+    # Assert
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-range"] == f"bytes 0-1999/{len(identity)}"
+    assert response.content == identity[:2000]
+
+
+def test_compressing_weakens_a_strong_etag():
+    # Act
+    identity_response = client.get("/static/js/bootstrap.js", headers={"Accept-Encoding": "identity"})
+    gzip_response = client.get("/static/js/bootstrap.js", headers={"Accept-Encoding": "gzip"})
+    revalidated = client.get("/static/js/bootstrap.js", headers={"Accept-Encoding": "gzip",
+                                                                 "If-None-Match": gzip_response.headers["etag"]})
+
+    # Assert
+    assert gzip_response.headers["content-encoding"] == "gzip"
+    assert not identity_response.headers["etag"].startswith("W/")
+    assert gzip_response.headers["etag"] == f"W/{identity_response.headers['etag']}"
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
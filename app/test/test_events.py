@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from ..events import EventHub, MemoryBroker
+from ..routers.todos import stream_events
+
+
+@pytest.mark.asyncio
+async def test_hub_delivers_only_to_the_owning_user():
+    hub = EventHub(MemoryBroker())
+    mine = hub.subscribe(1)
+    theirs = hub.subscribe(2)
+
+    await hub.publish(1, "created", [10])
+
+    assert await mine.get() == {"type": "created", "user_id": 1, "ids": [10]}
+    assert hub.stats()["delivered"] == 1
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(theirs.get(), timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_told_to_resync():
+    hub = EventHub(MemoryBroker(), queue_size=2)
+    subscription = hub.subscribe(1)
+
+    for todo_id in range(5):
+        await hub.publish(1, "updated", [todo_id])
+
+    assert [(await subscription.get())["ids"] for _ in range(2)] == [[0], [1]]
+    assert await subscription.get() == {"type": "resync", "user_id": 1}
+    assert hub.stats()["dropped"] == 3
+    await hub.publish(1, "deleted", [7])
+    assert (await subscription.get())["type"] == "deleted"
+
+
+@pytest.mark.asyncio
+async def test_large_batches_are_split(monkeypatch):
+    monkeypatch.setattr("app.events.EVENTS_MAX_IDS", 2)
+    hub = EventHub(MemoryBroker())
+    subscription = hub.subscribe(1)
+
+    await hub.publish(1, "deleted", [1, 2, 3])
+
+    assert (await subscription.get())["ids"] == [1, 2]
+    assert (await subscription.get())["ids"] == [3]
+
+
+@pytest.mark.asyncio
+async def test_stream_formats_events_and_unsubscribes(monkeypatch):
+    hub = EventHub(MemoryBroker())
+    monkeypatch.setattr("app.routers.todos.event_hub", hub)
+    stream = stream_events(1)
+
+    assert await anext(stream) == "retry: 3000\n\n"
+    await hub.publish(1, "created", [5])
+    assert await anext(stream) == 'event: created\ndata: {"type": "created", "user_id": 1, "ids": [5]}\n\n'
+    await stream.aclose()
+    assert hub.stats()["subscriptions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_never_started_holds_no_subscription(monkeypatch):
+    hub = EventHub(MemoryBroker())
+    monkeypatch.setattr("app.routers.todos.event_hub", hub)
+
+    stream = stream_events(1)
+    await stream.aclose()
+
+    assert hub.stats()["subscriptions"] == 0
@@ -1,7 +1,15 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
 from fastapi import status
+from fastapi.responses import ORJSONResponse
 from fastapi.testclient import TestClient
 
 from ..main import app
+from ..responses import get_json_response_class, PydanticJSONResponse, StdlibJSONResponse
 
 client = TestClient(app)
 
@@ -10,3 +18,37 @@ def test_health_check():
     response = client.get("/")
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"message": "ok"}
+
+
+def test_default_response_class_is_configurable():
+    assert issubclass(get_json_response_class("orjson"), ORJSONResponse)
+    assert issubclass(get_json_response_class("pydantic"), PydanticJSONResponse)
+    with pytest.raises(ValueError):
+        get_json_response_class("ujson")
+
+
+@pytest.mark.parametrize("response_class", [ORJSONResponse, PydanticJSONResponse, StdlibJSONResponse])
+def test_response_classes_render_the_same_json(response_class):
+    content = {"title": "Café", "priority": 1, "completed": False, "ratio": 0.5, "tags": [None]}
+
+    body = response_class(content).body
+
+    assert json.loads(body) == content
+
+
+def test_openapi_documents_response_models():
+    schemas = client.get("/openapi.json").json()["components"]["schemas"]
+    assert {"TodoResponse", "TodoBulkResult", "UserResponse", "TokenResponse", "CacheMetricsResponse"} <= schemas.keys()
+
+
+def test_import_has_no_side_effects():
+    # Arrange
+    env = {name: value for name, value in os.environ.items() if name != "DATABASE_URL"}
+    code = ("import sys, app.main, app.database as database; "
+            "print(database.engine is None, sorted({'jinja2', 'passlib', 'jwt'} & sys.modules.keys()))")
+
+    # Act
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+    # Assert
+    assert result.stdout.strip() == "True []"
@@ -0,0 +1,131 @@
+import logging
+import re
+from datetime import timedelta
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from .utils import *
+from .utils import engine as sync_engine
+from ..database import get_engine, dispose_engine, warm_up_pool, get_db, normalize_sql, track_queries
+from ..main import app
+from ..routers.auth import generate_access_token
+from ..timing import request_metrics
+
+client = TestClient(app)
+
+
+def bearer(user_role: str) -> dict:
+    token = generate_access_token({"sub": "johndoe123", "user_id": 1, "user_role": user_role}, timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/metrics/pool", "/metrics/caches", "/metrics/events"])
+def test_metrics_require_admin(path):
+    # Act
+    anonymous = client.get(path)
+    user = client.get(path, headers=bearer("user"))
+    admin = client.get(path, headers=bearer("admin"))
+
+    # Assert
+    assert anonymous.status_code == status.HTTP_401_UNAUTHORIZED
+    assert user.status_code == status.HTTP_403_FORBIDDEN
+    assert admin.status_code == status.HTTP_200_OK
+
+
+def test_get_pool_metrics():
+    response = client.get("/metrics/pool", headers=bearer("admin"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {"size", "checked_out", "idle", "overflow", "waits", "wait_time_total_ms"} <= response.json().keys()
+
+
+def test_get_cache_metrics():
+    response = client.get("/metrics/caches", headers=bearer("admin"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {"size", "hits", "misses", "hit_ratio"} <= response.json()["tokens"].keys()
+    assert {"backend", "hits", "misses", "invalidations", "hit_ratio"} <= response.json()["todos"].keys()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool_leaves_idle_connections():
+    # Act
+    await warm_up_pool(3)
+
+    # Assert
+    assert get_engine().pool.checkedin() == 3
+    assert get_engine().pool.checkedout() == 0
+    await dispose_engine()
+
+
+def test_request_metrics_in_prometheus_format():
+    # Arrange
+    request_metrics.reset()
+    client.get("/")
+    client.get("/todos/1")
+
+    # Act
+    response = client.get("/metrics", headers=bearer("admin"))
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/"} 1' in response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/",le="+Inf"} 1' in response.text
+    assert 'http_requests_total{method="GET",route="/todos/{todo_id}",status="401"} 1' in response.text
+    assert "http_requests_in_flight 1" in response.text
+
+
+def test_server_timing_breaks_down_phases(mock_data):
+    # Arrange
+    app.dependency_overrides[get_db] = override_get_db
+    token = generate_access_token({"sub": "johndoe123", "user_id": 1, "user_role": "user"}, timedelta(minutes=5))
+
+    # Act
+    try:
+        response = client.get("/todos/", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        app.dependency_overrides.clear()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert re.fullmatch(r'auth;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+, total;dur=[\d.]+',
+                        response.headers["Server-Timing"])
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT * FROM t\n WHERE id IN (?, ?, ?) AND name = 'x' LIMIT 10") == \
+           "SELECT * FROM t WHERE id IN (?) AND name = ? LIMIT ?"
+    assert normalize_sql("INSERT INTO t (a, b) VALUES ($1::VARCHAR, $2), ($3, $4)") == "INSERT INTO t (a, b) VALUES (?)"
+
+
+def test_slow_queries_are_logged(caplog, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.database.DB_SLOW_QUERY_MS", 0)
+
+    # Act
+    with caplog.at_level(logging.WARNING, logger="app.database"), sync_engine.connect() as connection:
+        connection.execute(text("SELECT 42"))
+
+    # Assert
+    assert "Slow query" in caplog.text
+    assert "in background: SELECT ?" in caplog.text
+
+
+def test_repeated_statements_are_flagged(caplog, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.database.DB_REPEATED_QUERY_THRESHOLD", 3)
+
+    # Act
+    with caplog.at_level(logging.WARNING, logger="app.database"), track_queries("GET /todos/") as queries, \
+            sync_engine.connect() as connection:
+        for todo_id in range(4):
+            connection.execute(text("SELECT title FROM Todos WHERE id = :id"), {"id": todo_id})
+
+    # Assert
+    assert queries.count == 4
+    assert queries.repeated() == {"SELECT title FROM Todos WHERE id = ?": 4}
+    assert caplog.text.count("Possible N+1 in GET /todos/") == 1
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException, status
+
+from ..passwords import (PasswordHasherPool, hash_password, verify_password, calibrate, build_password_context,
+                         get_password_context, password_needs_update)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password():
+    hashed_password = await hash_password("12345aA@")
+
+    assert await verify_password("12345aA@", hashed_password)
+    assert not await verify_password("12345aA@@", hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_work_when_saturated():
+    # Arrange
+    pool = PasswordHasherPool(workers=1, queue_depth=1)
+    release = threading.Event()
+    running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    # Act
+    with pytest.raises(HTTPException) as ex:
+        await pool.run(release.wait)
+    release.set()
+    await asyncio.gather(*running)
+
+    # Assert
+    assert ex.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert pool.pending == 0
+
+
+def test_calibrate_stays_within_budget():
+    cost, elapsed_ms = calibrate("bcrypt", target_ms=50, samples=1)
+
+    assert cost >= 4
+    assert elapsed_ms <= 50 or cost == 4
+
+
+def test_other_schemes_still_verify_and_need_update():
+    scrypt_context = build_password_context("scrypt", 10)
+    scrypt_hash = scrypt_context.hash("12345aA@")
+
+    assert get_password_context().verify("12345aA@", scrypt_hash)
+    assert password_needs_update(scrypt_hash)
@@ -0,0 +1,110 @@
+import re
+from datetime import timedelta
+
+from fastapi import status
+from sqlalchemy import insert
+
+from .utils import *
+from ..routers.auth import get_current_user, generate_access_token
+from ..database import get_db, get_session_factory
+from ..models import utcnow
+from ..routers.todos import encode_sync_token
+
+USERS = 50
+TODOS_PER_USER = 200
+
+# A plan line like "SCAN Todos" means SQLite walks the whole table (or a whole index of it)
+FULL_SCAN = re.compile(r"^SCAN (Todos|TodoCounters|Users)\b")
+
+# Every query-issuing route, with the identity it runs as; only the admin listing and global stats read whole tables
+ROUTES = [
+    ("GET", "/todos/", {}, "user", False),
+    ("GET", "/todos/", {"params": {"sort": "priority", "limit": 10}}, "user", False),
+    ("GET", "/todos/", {"params": {"completed": False, "priority_min": 2}}, "user", False),
+    ("GET", "/todos/", {"params": {"cursor": "WzEwXQ"}}, "user", False),
+    ("GET", "/todos/3", {}, "user", False),
+    ("GET", "/todos/changes", {}, "user", False),
+    ("GET", "/todos/stats", {}, "user", False),
+    ("GET", "/todos/search", {"params": {"q": "todo 1"}}, "user", False),
+    ("GET", "/todos/changes", {"params": {"since": encode_sync_token(utcnow() - timedelta(days=1), 0)}}, "user",
+     False),
+    ("PUT", "/todos/4", {"json": {"title": "Updated", "description": "Updated", "priority": 2}}, "user", False),
+    ("DELETE", "/todos/5", {}, "user", False),
+    ("PATCH", "/todos/bulk", {"json": [{"id": 9, "title": "Bulk", "description": "Bulk", "priority": 1}]}, "user",
+     False),
+    ("DELETE", "/todos/bulk", {"json": [10, 11]}, "user", False),
+    ("GET", "/todos/todo-page", {}, "cookie", False),
+    ("GET", "/todos/edit-todo-page/6", {}, "cookie", False),
+    ("GET", "/todos/admin/", {}, "admin", True),
+    ("GET", "/todos/admin/", {"params": {"user_id": 3, "cursor": "WzEwXQ"}}, "admin", False),
+    ("GET", "/todos/admin/export", {"params": {"user_id": 3}}, "admin", False),
+    ("GET", "/todos/admin/stats", {}, "admin", True),
+    ("GET", "/todos/admin/7", {}, "admin", False),
+    ("DELETE", "/todos/admin/8", {}, "admin", False),
+    ("GET", "/users/", {}, "user", False),
+    ("PUT", "/users/phone-number/0000000000", {}, "user", False),
+    ("POST", "/auth/login", {"data": {"username": "johndoe123", "password": "12345aA@"}}, "anonymous", False),
+]
+
+
+@pytest.fixture
+def seeded_db():
+    with engine.begin() as connection:
+        connection.execute(insert(Users), [
+            {"id": user_id, "username": "johndoe123" if user_id == 1 else f"user{user_id}",
+             "email": f"user{user_id}@example.com", "first_name": "John", "last_name": "Doe", "is_active": True,
+             "role": "admin" if user_id == 2 else "user", "phone_number": "0123456789",
+             "hashed_password": get_password_context().hash("12345aA@") if user_id == 1 else None}
+            for user_id in range(1, USERS + 1)
+        ])
+        connection.execute(insert(Todos), [
+            {"user_id": user_id, "title": f"Todo {index}", "description": "Seeded todo", "priority": index % 5 + 1,
+             "completed": index % 3 == 0}
+            for user_id in range(1, USERS + 1) for index in range(TODOS_PER_USER)
+        ])
+        connection.exec_driver_sql("ANALYZE")
+    clear_todo_cache()
+    yield
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM Todos")
+        connection.exec_driver_sql("DELETE FROM TodoCounters")
+        connection.exec_driver_sql("DELETE FROM Users")
+        connection.exec_driver_sql("DELETE FROM sqlite_stat1")
+    clear_todo_cache()
+
+
+def explain(statement: str, parameters) -> list[str]:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("method,url,kwargs,identity,allow_full_scan", ROUTES)
+def test_route_queries_use_indexes(seeded_db, method, url, kwargs, identity, allow_full_scan):
+    # Arrange
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
+    if identity == "user":
+        app.dependency_overrides[get_current_user] = override_get_current_user
+    elif identity == "admin":
+        app.dependency_overrides[get_current_user] = override_get_current_admin
+    elif identity == "cookie":
+        claims = {"sub": "johndoe123", "user_id": 1, "user_role": "user"}
+        client.cookies.set("access_token", generate_access_token(claims, timedelta(minutes=5)))
+
+    # Act
+    try:
+        with capture_statements() as statements:
+            response = client.request(method, url, **kwargs)
+    finally:
+        app.dependency_overrides.clear()
+        client.cookies.clear()
+    explainable = [(statement, parameters) for statement, parameters, executemany in statements
+                   if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))]
+
+    # Assert
+    assert response.status_code < status.HTTP_400_BAD_REQUEST
+    assert explainable
+    for statement, parameters in explainable:
+        full_scans = [line for line in explain(statement, parameters) if FULL_SCAN.match(line)]
+        assert allow_full_scan or not full_scans, f"{statement!r} falls back to {full_scans}"
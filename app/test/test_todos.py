@@ -1,10 +1,17 @@
+from datetime import datetime, timedelta
+
 from fastapi import status
+from sqlalchemy import select, create_engine, inspect
 
 from .utils import *
+from ..cache import todo_cache
+from ..events import event_hub
 from ..main import app
-from ..models import Todos
-from ..routers.auth import get_current_user
-from ..routers.todos import get_db
+from ..manage import purge_tombstones, reconcile_todo_stats, migrate
+from ..models import Todos, TodoCounters, utcnow
+from ..pagination import encode_cursor
+from ..routers.auth import get_current_user, generate_access_token
+from ..routers.todos import get_db, decode_sync_token
 
 
 @pytest.fixture(autouse=True)
@@ -22,6 +29,69 @@ def test_get_todos_authenticated(mock_data):
     assert len(list(response.json())) > 0
 
 
+@pytest.fixture
+def many_todos(mock_data):
+    with TestSessionLocal() as db:
+        db.add_all([Todos(user_id=1, title=f"Todo {index}", description="Paginated todo", priority=index % 5 + 1,
+                          completed=index % 2 == 0) for index in range(1, 12)])
+        db.commit()
+
+
+@pytest.fixture
+def other_user_todo(mock_data):
+    with TestSessionLocal() as db:
+        todo = Todos(user_id=2, title="Admin todo", description="Not yours", priority=1, completed=False)
+        db.add(todo)
+        db.commit()
+        return todo.id
+
+
+def test_get_todos_paginated(many_todos):
+    # Act
+    first_page = client.get("/todos/", params={"limit": 5})
+    second_page = client.get("/todos/", params={"limit": 5, "cursor": first_page.headers["X-Next-Cursor"]})
+    last_page = client.get("/todos/", params={"limit": 5, "cursor": second_page.headers["X-Next-Cursor"]})
+
+    # Assert
+    ids = [todo["id"] for page in (first_page, second_page, last_page) for todo in page.json()]
+    assert ids == list(range(1, 13))
+    assert "X-Next-Cursor" not in last_page.headers
+
+
+def test_get_todos_sorted_by_priority(many_todos):
+    # Act
+    first_page = client.get("/todos/", params={"limit": 7, "sort": "priority"})
+    second_page = client.get("/todos/", params={"limit": 7, "sort": "priority",
+                                                "cursor": first_page.headers["X-Next-Cursor"]})
+
+    # Assert
+    todos = first_page.json() + second_page.json()
+    assert len(todos) == 12
+    assert [(todo["priority"], todo["id"]) for todo in todos] == sorted((todo["priority"], todo["id"]) for todo in todos)
+
+
+def test_get_todos_filtered(many_todos):
+    response = client.get("/todos/", params={"completed": True, "priority_min": 2, "priority_max": 4})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()
+    assert all(todo["completed"] and 2 <= todo["priority"] <= 4 for todo in response.json())
+
+
+@pytest.mark.parametrize("sort, cursor", [("id", "not-a-cursor"), ("id", encode_cursor(2 ** 70)),
+                                          ("id", encode_cursor(-(2 ** 64))), ("id", encode_cursor(True)),
+                                          ("priority", encode_cursor("3", 1)), ("priority", encode_cursor(3, 1.5)),
+                                          ("priority", encode_cursor(3))])
+def test_get_todos_invalid_cursor(mock_data, sort, cursor):
+    response = client.get("/todos/", params={"sort": sort, "cursor": cursor})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_todos_page_size_cap(mock_data):
+    response = client.get("/todos/", params={"limit": 100000})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 def test_get_todo_authenticated(mock_data):
     response = client.get(f"/todos/{mock_data["todo"].id}")
     assert response.status_code == status.HTTP_200_OK
@@ -31,7 +101,8 @@ def test_get_todo_authenticated(mock_data):
         "title": "Todo Test",
         "description": "This is a todo test",
         "priority": 5,
-        "completed": False
+        "completed": False,
+        "updated_at": mock_data["todo"].updated_at.isoformat()
     }
 
 
@@ -43,6 +114,11 @@ def test_get_todo_authenticated_not_found():
     }
 
 
+def test_get_todo_of_another_user(other_user_todo):
+    response = client.get(f"/todos/{other_user_todo}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 def test_create_todo_authenticated(mock_data):
     # Arrange
     request_body = {
@@ -78,7 +154,8 @@ def test_update_todo_authenticated(mock_data):
     }
 
     # Act
-    response = client.put(f"/todos/{mock_data["todo"].id}", json=request_body)
+    with assert_query_count(1):
+        response = client.put(f"/todos/{mock_data["todo"].id}", json=request_body)
     with TestSessionLocal() as db:
         todo_model = db.query(Todos).where(Todos.id == mock_data["todo"].id).first()
 
@@ -109,13 +186,39 @@ def test_update_todo_not_found():
     }
 
 
+def test_update_todo_of_another_user(other_user_todo):
+    # Arrange
+    request_body = {"title": "Hijacked", "description": "Hijacked", "priority": 1, "completed": True}
+
+    # Act
+    response = client.put(f"/todos/{other_user_todo}", json=request_body)
+    with TestSessionLocal() as db:
+        todo_model = db.query(Todos).where(Todos.id == other_user_todo).first()
+
+    # Assert
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert todo_model.title == "Admin todo"
+
+
 def test_delete_todo_authenticated(mock_data):
-    response = client.delete(f"/todos/{mock_data["todo"].id}")
+    with assert_query_count(1):
+        response = client.delete(f"/todos/{mock_data["todo"].id}")
     with TestSessionLocal() as db:
         todo_model = db.query(Todos).where(Todos.id == mock_data["todo"].id).first()
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
-    assert not todo_model
+    assert todo_model.deleted_at is not None
+    assert client.get(f"/todos/{mock_data["todo"].id}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.delete(f"/todos/{mock_data["todo"].id}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_todo_of_another_user(other_user_todo):
+    response = client.delete(f"/todos/{other_user_todo}")
+    with TestSessionLocal() as db:
+        todo_model = db.query(Todos).where(Todos.id == other_user_todo).first()
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert todo_model is not None
 
 
 def test_delete_todo_not_found():
@@ -124,3 +227,501 @@ def test_delete_todo_not_found():
     assert response.json() == {
         "detail": "Todo not found"
     }
+
+
+def test_create_todos_bulk(mock_data):
+    # Arrange
+    request_body = [{"title": f"Bulk {index}", "description": "Created in bulk", "priority": 3} for index in range(3)]
+
+    # Act
+    response = client.post("/todos/bulk", json=request_body)
+    with TestSessionLocal() as db:
+        titles = db.scalars(select(Todos.title).where(Todos.id.in_([item["id"] for item in response.json()]))
+                            .order_by(Todos.id)).all()
+
+    # Assert
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [item["status"] for item in response.json()] == ["created"] * 3
+    assert titles == ["Bulk 0", "Bulk 1", "Bulk 2"]
+
+
+def test_update_todos_bulk(mock_data):
+    # Arrange
+    request_body = [
+        {"id": mock_data["todo"].id, "title": "Bulk updated", "description": "Updated in bulk", "priority": 1,
+         "completed": True},
+        {"id": 111111111, "title": "Missing", "description": "Missing", "priority": 1},
+    ]
+
+    # Act
+    response = client.patch("/todos/bulk", json=request_body)
+    with TestSessionLocal() as db:
+        todo_model = db.query(Todos).where(Todos.id == mock_data["todo"].id).first()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"id": mock_data["todo"].id, "status": "updated"},
+                               {"id": 111111111, "status": "not_found"}]
+    assert todo_model.title == "Bulk updated"
+    assert todo_model.completed is True
+
+
+def test_update_todos_bulk_skips_deleted_todos(mock_data):
+    # Arrange
+    client.request("DELETE", "/todos/bulk", json=[mock_data["todo"].id])
+    request_body = [{"id": mock_data["todo"].id, "title": "Revived", "description": "Revived", "priority": 1}]
+
+    # Act
+    response = client.patch("/todos/bulk", json=request_body)
+    with TestSessionLocal() as db:
+        todo_model = db.query(Todos).where(Todos.id == mock_data["todo"].id).first()
+
+    # Assert
+    assert response.json() == [{"id": mock_data["todo"].id, "status": "not_found"}]
+    assert todo_model.title != "Revived"
+
+
+def test_delete_todos_bulk(mock_data):
+    # Act
+    response = client.request("DELETE", "/todos/bulk", json=[mock_data["todo"].id, 111111111])
+    with TestSessionLocal() as db:
+        todo_model = db.query(Todos).where(Todos.id == mock_data["todo"].id).first()
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"id": mock_data["todo"].id, "status": "deleted"},
+                               {"id": 111111111, "status": "not_found"}]
+    assert todo_model.deleted_at is not None
+
+
+def test_bulk_writes_stay_within_query_budget(mock_data, max_queries):
+    # Arrange
+    request_body = [{"title": f"Bulk {index}", "description": "Budget", "priority": 2} for index in range(50)]
+
+    # Act
+    with max_queries(1):
+        created = client.post("/todos/bulk", json=request_body).json()
+    with max_queries(1):
+        client.patch("/todos/bulk", json=[{**todo, "id": item["id"]} for todo, item in zip(request_body, created)])
+    with max_queries(2):
+        todos = client.get("/todos/", params={"limit": 100}).json()
+    with max_queries(1):
+        client.request("DELETE", "/todos/bulk", json=[item["id"] for item in created])
+
+    # Assert
+    assert len(todos) == 51
+
+
+@pytest.mark.parametrize("method, status_code", [("POST", status.HTTP_201_CREATED), ("PATCH", status.HTTP_200_OK),
+                                                 ("DELETE", status.HTTP_200_OK)])
+def test_bulk_empty_batch(mock_data, method, status_code):
+    # Act
+    response = client.request(method, "/todos/bulk", json=[])
+
+    # Assert
+    assert response.status_code == status_code
+    assert response.json() == []
+
+
+def test_bulk_batch_size_limit(mock_data, monkeypatch):
+    monkeypatch.setattr("app.routers.todos.TODOS_BULK_MAX_ITEMS", 2)
+    response = client.request("DELETE", "/todos/bulk", json=[1, 2, 3])
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+def test_get_todos_served_from_cache(mock_data):
+    # Arrange
+    client.get("/todos/")
+    client.get(f"/todos/{mock_data["todo"].id}")
+
+    # Act
+    with assert_query_count(0):
+        list_response = client.get("/todos/")
+        todo_response = client.get(f"/todos/{mock_data["todo"].id}")
+
+    # Assert
+    assert list_response.json()[0]["title"] == "Todo Test"
+    assert todo_response.json()["title"] == "Todo Test"
+
+
+def test_writes_invalidate_cached_todos(mock_data):
+    # Arrange
+    client.get("/todos/")
+    request_body = {"title": "Todo Test Updated", "description": "Updated", "priority": 1, "completed": True}
+
+    # Act
+    client.put(f"/todos/{mock_data["todo"].id}", json=request_body)
+    after_update = client.get("/todos/")
+    client.post("/todos/", json=request_body)
+    after_create = client.get("/todos/")
+
+    # Assert
+    assert after_update.json()[0]["title"] == "Todo Test Updated"
+    assert len(after_create.json()) == 2
+
+
+def test_admin_delete_invalidates_owner_cache(mock_data):
+    # Arrange
+    client.get(f"/todos/{mock_data["todo"].id}")
+    app.dependency_overrides[get_current_user] = override_get_current_admin
+
+    # Act
+    client.delete(f"/todos/admin/{mock_data["todo"].id}")
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    response = client.get(f"/todos/{mock_data["todo"].id}")
+
+    # Assert
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.fixture
+def signed_in_cookie():
+    claims = {"sub": "johndoe123", "user_id": 1, "user_role": "user"}
+    client.cookies.set("access_token", generate_access_token(claims, timedelta(minutes=5)))
+    yield
+    client.cookies.clear()
+
+
+def test_todo_page_rows_cached_until_todos_change(mock_data, signed_in_cookie):
+    # Arrange
+    client.get("/todos/todo-page")
+    request_body = {"title": "Todo Test Updated", "description": "Updated", "priority": 1, "completed": True}
+
+    # Act
+    with assert_query_count(0):
+        cached = client.get("/todos/todo-page")
+    client.put(f"/todos/{mock_data["todo"].id}", json=request_body)
+    after_update = client.get("/todos/todo-page")
+
+    # Assert
+    assert cached.status_code == status.HTTP_200_OK
+    assert cached.headers["content-type"].startswith("text/html")
+    assert "Todo Test</td>" in cached.text
+    assert "Logout" in cached.text
+    assert "Todo Test Updated" in after_update.text
+    assert "strike-through-td" in after_update.text
+
+
+def test_todo_page_streams_long_lists_without_caching_them(mock_data, signed_in_cookie, monkeypatch):
+    # Arrange
+    monkeypatch.setattr("app.routers.todos.TODOS_PAGE_CACHE_MAX_ROWS", 1)
+    client.post("/todos/bulk", json=[{"title": "Second", "description": "Second", "priority": 2}])
+    client.get("/todos/todo-page")
+
+    # Act
+    with assert_query_count(1):
+        response = client.get("/todos/todo-page")
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    table_end = response.text.index("</tbody>")
+    assert response.text.index("Todo Test</td>") < table_end
+    assert response.text.index("Second</td>") < table_end
+
+
+def test_get_todos_not_modified(mock_data):
+    # Arrange
+    etag = client.get("/todos/").headers["ETag"]
+
+    # Act
+    with assert_query_count(0):
+        not_modified = client.get("/todos/", headers={"If-None-Match": etag})
+    client.request("DELETE", "/todos/bulk", json=[mock_data["todo"].id])
+    after_delete = client.get("/todos/", headers={"If-None-Match": etag})
+
+    # Assert
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    assert after_delete.status_code == status.HTTP_200_OK
+    assert after_delete.headers["ETag"] != etag
+
+
+def test_get_todos_etag_racing_a_write_is_not_reused(mock_data, monkeypatch):
+    # Arrange
+    original_set = todo_cache.set
+
+    async def write_before_set(user_id, key, value, generation):
+        # Another request's write commits after this one computed its ETag, but before it is cached
+        if key == "etag":
+            with TestSessionLocal() as db:
+                db.get(Todos, mock_data["todo"].id).title = "Changed meanwhile"
+                db.commit()
+            await todo_cache.invalidate(user_id)
+        await original_set(user_id, key, value, generation)
+
+    monkeypatch.setattr(todo_cache, "set", write_before_set)
+    stale_etag = client.get("/todos/").headers["ETag"]
+    monkeypatch.setattr(todo_cache, "set", original_set)
+
+    # Act
+    response = client.get("/todos/", headers={"If-None-Match": stale_etag})
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["title"] == "Changed meanwhile"
+
+
+def test_get_todo_conditional_headers(mock_data):
+    # Arrange
+    response = client.get(f"/todos/{mock_data["todo"].id}")
+
+    # Act
+    by_etag = client.get(f"/todos/{mock_data["todo"].id}", headers={"If-None-Match": response.headers["ETag"]})
+    by_date = client.get(f"/todos/{mock_data["todo"].id}",
+                         headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    stale_date = client.get(f"/todos/{mock_data["todo"].id}",
+                            headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+
+    # Assert
+    assert response.headers["ETag"].startswith('W/"')
+    assert by_etag.status_code == status.HTTP_304_NOT_MODIFIED
+    assert by_date.status_code == status.HTTP_304_NOT_MODIFIED
+    assert stale_date.status_code == status.HTTP_200_OK
+
+
+def test_bulk_update_bumps_updated_at(mock_data):
+    # Arrange
+    etag = client.get(f"/todos/{mock_data["todo"].id}").headers["ETag"]
+    request_body = [{"id": mock_data["todo"].id, "title": "Bulk updated", "description": "Updated", "priority": 1}]
+
+    # Act
+    client.patch("/todos/bulk", json=request_body)
+    response = client.get(f"/todos/{mock_data["todo"].id}", headers={"If-None-Match": etag})
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
+def test_writes_publish_change_events(mock_data):
+    # Arrange
+    subscription = event_hub.subscribe(1)
+    request_body = {"title": "Todo Test Updated", "description": "Updated", "priority": 1, "completed": True}
+
+    # Act
+    try:
+        client.put(f"/todos/{mock_data["todo"].id}", json=request_body)
+        client.request("DELETE", "/todos/bulk", json=[mock_data["todo"].id])
+        events = [asyncio.run(subscription.get()) for _ in range(2)]
+    finally:
+        event_hub.unsubscribe(subscription)
+
+    # Assert
+    assert events == [{"type": "updated", "user_id": 1, "ids": [mock_data["todo"].id]},
+                      {"type": "deleted", "user_id": 1, "ids": [mock_data["todo"].id]}]
+
+
+def test_stream_requires_authentication():
+    response = client.get("/todos/stream")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+def settled_immediately(monkeypatch):
+    monkeypatch.setattr("app.routers.todos.TODOS_SYNC_SETTLE_SECONDS", 0)
+
+
+def test_todo_changes_since_last_sync(many_todos, settled_immediately):
+    # Arrange
+    first_sync = client.get("/todos/changes").json()
+    request_body = {"title": "Changed", "description": "Changed", "priority": 1, "completed": True}
+
+    # Act
+    client.put("/todos/3", json=request_body)
+    client.delete("/todos/4")
+    delta = client.get("/todos/changes", params={"since": first_sync["sync_token"]}).json()
+    nothing_new = client.get("/todos/changes", params={"since": delta["sync_token"]}).json()
+    still_nothing = client.get("/todos/changes", params={"since": nothing_new["sync_token"]}).json()
+
+    # Assert
+    assert len(first_sync["todos"]) == 12
+    assert first_sync["deleted_ids"] == []
+    assert [todo["id"] for todo in delta["todos"]] == [3]
+    assert delta["todos"][0]["title"] == "Changed"
+    assert delta["deleted_ids"] == [4]
+    assert {**nothing_new, "sync_token": None} == {"todos": [], "deleted_ids": [], "sync_token": None,
+                                                   "has_more": False}
+    # An idle client's token still moves forward, so it never ages past the tombstone retention
+    assert decode_sync_token(nothing_new["sync_token"]) > decode_sync_token(delta["sync_token"])
+    assert still_nothing["todos"] == still_nothing["deleted_ids"] == []
+
+
+def test_todo_changes_paginated(many_todos, settled_immediately):
+    # Act
+    first_page = client.get("/todos/changes", params={"limit": 10}).json()
+    second_page = client.get("/todos/changes", params={"limit": 10, "since": first_page["sync_token"]}).json()
+
+    # Assert
+    assert first_page["has_more"] is True
+    assert second_page["has_more"] is False
+    assert len({todo["id"] for todo in first_page["todos"] + second_page["todos"]}) == 12
+
+
+def test_todo_changes_hold_back_unsettled_writes(mock_data):
+    response = client.get("/todos/changes")
+    assert response.json()["todos"] == []
+
+
+def test_todo_changes_expired_token(mock_data, monkeypatch):
+    # Arrange
+    token = client.get("/todos/changes").json()["sync_token"]
+    monkeypatch.setattr("app.routers.todos.TODOS_TOMBSTONE_RETENTION_DAYS", 0)
+
+    # Act
+    response = client.get("/todos/changes", params={"since": token})
+
+    # Assert
+    assert response.status_code == status.HTTP_410_GONE
+
+
+@pytest.mark.parametrize("values", [[10 ** 18, 1], [-(10 ** 18), 1], [0, 2 ** 64], "not a token"])
+def test_todo_changes_invalid_token(mock_data, values):
+    # Arrange
+    token = values if isinstance(values, str) else encode_cursor(*values)
+
+    # Act
+    response = client.get("/todos/changes", params={"since": token})
+
+    # Assert
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Invalid sync token"
+
+
+def test_migrate_adopts_a_schema_made_by_create_all(tmp_path):
+    # Arrange
+    database_url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    legacy = create_engine(database_url)
+    with legacy.begin() as connection:
+        # What the app's create_all built before migrations took over, with a user's data in it
+        connection.exec_driver_sql('''CREATE TABLE "Users" (id INTEGER PRIMARY KEY, email VARCHAR(255),
+            username VARCHAR(255), first_name VARCHAR(50), last_name VARCHAR(50), hashed_password VARCHAR(255),
+            is_active BOOLEAN, role VARCHAR(50), phone_number VARCHAR(10) NOT NULL)''')
+        connection.exec_driver_sql('''CREATE TABLE "Todos" (id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES "Users" (id), title VARCHAR(255), description VARCHAR(255),
+            priority INTEGER, completed BOOLEAN)''')
+        connection.exec_driver_sql('''INSERT INTO "Users" (id, username, phone_number) VALUES (1, 'old', '0')''')
+        connection.exec_driver_sql('''INSERT INTO "Todos" (user_id, title, priority, completed)
+            VALUES (1, 'Kept', 2, 0)''')
+
+    # Act
+    stamped = migrate(database_url)
+    stamped_again = migrate(database_url)
+
+    # Assert
+    assert stamped is True
+    assert stamped_again is False
+    with legacy.connect() as connection:
+        assert "TodoCounters" in inspect(connection).get_table_names()
+        assert connection.exec_driver_sql('SELECT title FROM "Todos"').scalar() == "Kept"
+        assert connection.exec_driver_sql('SELECT count FROM "TodoCounters"').scalar() == 1
+    legacy.dispose()
+
+
+@pytest.mark.asyncio
+async def test_purge_tombstones(mock_data):
+    # Arrange
+    with TestSessionLocal() as db:
+        db.add_all([Todos(user_id=1, title=f"Deleted {index}", description="Gone", priority=1,
+                          deleted_at=datetime(2000, 1, 1)) for index in range(5)])
+        db.commit()
+
+    # Act
+    purged = await purge_tombstones(TestAsyncSessionLocal, utcnow() - timedelta(days=30), batch_size=2)
+
+    # Assert
+    with TestSessionLocal() as db:
+        assert db.query(Todos).count() == 1
+    assert purged == 5
+
+
+@pytest.fixture
+def searchable_todos(mock_data):
+    with TestSessionLocal() as db:
+        db.add_all([
+            Todos(user_id=1, title="Buy groceries", description="Milk, eggs and bread", priority=2),
+            Todos(user_id=1, title="Plan trip", description="Book flights and groceries for the road", priority=3),
+            Todos(user_id=1, title="Running shoes", description="Replace the old pair", priority=1),
+            Todos(user_id=2, title="Groceries for admin", description="Not yours", priority=1),
+        ])
+        db.commit()
+
+
+def test_search_todos_ranks_title_matches_first(searchable_todos):
+    response = client.get("/todos/search", params={"q": "groceries"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["title"] for todo in response.json()] == ["Buy groceries", "Plan trip"]
+
+
+def test_search_todos_prefix_and_stemming(searchable_todos):
+    assert [todo["title"] for todo in client.get("/todos/search", params={"q": "groc bre"}).json()] == \
+           ["Buy groceries"]
+    assert [todo["title"] for todo in client.get("/todos/search", params={"q": "run"}).json()] == ["Running shoes"]
+
+
+def test_search_todos_paginated(searchable_todos):
+    # Act
+    first_page = client.get("/todos/search", params={"q": "groceries", "limit": 1})
+    second_page = client.get("/todos/search", params={"q": "groceries", "limit": 1,
+                                                      "cursor": first_page.headers["X-Next-Cursor"]})
+
+    # Assert
+    assert [todo["id"] for todo in first_page.json() + second_page.json()] == [2, 3]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+@pytest.mark.parametrize("offset", [-1, 2 ** 63])
+def test_search_todos_invalid_cursor(searchable_todos, offset):
+    response = client.get("/todos/search", params={"q": "groceries", "cursor": encode_cursor(offset)})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_search_todos_skips_deleted(searchable_todos):
+    client.delete("/todos/2")
+    response = client.get("/todos/search", params={"q": "groceries"})
+    assert [todo["id"] for todo in response.json()] == [3]
+
+
+def test_search_todos_ignores_query_syntax(searchable_todos):
+    response = client.get("/todos/search", params={"q": "\"') & | ! :* NEAR("})
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_todo_stats_follow_writes(mock_data):
+    # Arrange
+    client.post("/todos/bulk", json=[{"title": f"Bulk {index}", "description": "Bulk", "priority": index}
+                                     for index in range(1, 4)])
+
+    # Act
+    client.put("/todos/2", json={"title": "Done", "description": "Done", "priority": 1, "completed": True})
+    client.patch("/todos/bulk", json=[{"id": 3, "title": "Moved", "description": "Moved", "priority": 4}])
+    client.delete("/todos/4")
+    response = client.get("/todos/stats")
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"total": 3, "completed": 1, "open": 2,
+                               "open_by_priority": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}}
+
+
+def test_todo_stats_only_count_own_todos(other_user_todo):
+    response = client.get("/todos/stats")
+    assert response.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reconcile_todo_stats(mock_data):
+    # Arrange
+    with TestSessionLocal() as db:
+        db.query(TodoCounters).update({TodoCounters.count: 7})
+        db.add(TodoCounters(user_id=2, priority=1, completed=True, count=3))
+        db.commit()
+
+    # Act
+    drifted = await reconcile_todo_stats(TestAsyncSessionLocal)
+
+    # Assert
+    assert drifted == 2
+    assert client.get("/todos/stats").json()["open_by_priority"]["5"] == 1
+    assert await reconcile_todo_stats(TestAsyncSessionLocal) == 0
@@ -65,3 +65,18 @@ def test_change_phone_number(mock_data):
 
     # Assert
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_get_user_info_not_modified(mock_data):
+    # Arrange
+    etag = client.get("/users/").headers["ETag"]
+
+    # Act
+    not_modified = client.get("/users/", headers={"If-None-Match": etag})
+    client.put("/users/phone-number/0000000000")
+    after_change = client.get("/users/", headers={"If-None-Match": etag})
+
+    # Assert
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert after_change.status_code == status.HTTP_200_OK
+    assert after_change.json()["user"]["phone_number"] == "0000000000"
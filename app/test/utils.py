@@ -1,28 +1,45 @@
+import asyncio
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool.impl import StaticPool
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool.impl import StaticPool, NullPool
 
+from ..cache import todo_cache
+from ..database import normalize_sql, DB_REPEATED_QUERY_THRESHOLD
 from ..main import app
 from ..models import Base, Todos, Users
-from ..routers.auth import bcrypt_context
+from ..passwords import get_password_context
 
 SQLITE_URL = "sqlite:///./testdb.db"
+ASYNC_SQLITE_URL = "sqlite+aiosqlite:///./testdb.db"
 
 engine = create_engine(SQLITE_URL, connect_args={'check_same_thread': False}, poolclass=StaticPool)
 
+# TestClient runs every request on a fresh event loop, so the async engine must not pool connections
+async_engine = create_async_engine(ASYNC_SQLITE_URL, poolclass=NullPool)
+
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 Base.metadata.create_all(bind=engine)
 
 
-def override_get_db() -> Session:
-    db = TestSessionLocal()
-    try:
+def clear_todo_cache():
+    # Fixtures write straight to the database, past the routers' cache invalidation
+    asyncio.run(todo_cache.clear())
+
+
+async def override_get_db() -> AsyncSession:
+    async with TestAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def override_get_session_factory() -> async_sessionmaker:
+    return TestAsyncSessionLocal
 
 
 def override_get_current_user():
@@ -36,15 +53,54 @@ def override_get_current_admin():
 client = TestClient(app)
 
 
+@contextmanager
+def capture_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters, executemany))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+
+@contextmanager
+def assert_query_count(expected: int):
+    with capture_statements() as statements:
+        yield statements
+    issued = [statement for statement, _, _ in statements]
+    assert len(issued) == expected, f"expected {expected} statements, got {len(issued)}: {issued}"
+
+
+@pytest.fixture
+def max_queries():
+    """Fails when a block issues more statements than its budget, or repeats one the way an N+1 loop does."""
+
+    @contextmanager
+    def check(limit: int):
+        with capture_statements() as statements:
+            yield statements
+        issued = [normalize_sql(statement) for statement, _, _ in statements]
+        assert len(issued) <= limit, f"expected at most {limit} statements, got {len(issued)}: {issued}"
+        repeated = {statement for statement in issued if issued.count(statement) >= DB_REPEATED_QUERY_THRESHOLD}
+        assert not repeated, f"statements repeated {DB_REPEATED_QUERY_THRESHOLD}+ times: {repeated}"
+
+    return check
+
+
 @pytest.fixture
 def mock_data():
     user = Users(username="johndoe123", email="johndoe123@example.com", first_name="John", last_name="Doe",
                  is_active=True, role="user",
-                 phone_number="0123456789", hashed_password=bcrypt_context.hash("12345aA@"))
+                 phone_number="0123456789", hashed_password=get_password_context().hash("12345aA@"))
     admin = Users(username="admin", email="admin@example.com", first_name="David", last_name="Louis", is_active=True,
                   role="admin",
                   phone_number="0123456789")
     todo = Todos(user_id=1, title="Todo Test", description="This is a todo test", priority=5, completed=False)
+    clear_todo_cache()
     db = TestSessionLocal()
     db.add(user)
     db.add(admin)
@@ -53,5 +109,7 @@ def mock_data():
     yield {"todo": todo, "user": user, "admin": admin}
     with engine.connect() as connection:
         connection.execute(text("DELETE FROM Todos"))
+        connection.execute(text("DELETE FROM TodoCounters"))
         connection.execute(text("DELETE FROM Users"))
         connection.commit()
+    clear_todo_cache()
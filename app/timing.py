@@ -0,0 +1,181 @@
+"""Per-request timing: Server-Timing phases and the latency metrics behind GET /metrics."""
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from .config import env_bool
+from .database import track_queries
+
+SERVER_TIMING_ENABLED = env_bool("SERVER_TIMING_ENABLED", True)
+# Upper bounds in seconds, the same defaults as the Prometheus client libraries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ("auth", "db", "serialize")
+
+# Seconds spent per phase by the request being served; shared with the threads and greenlets it runs on
+request_phases: ContextVar[Optional[dict]] = ContextVar("request_phases", default=None)
+
+
+@contextmanager
+def timed(phase: str):
+    phases = request_phases.get()
+    if phases is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - started
+
+
+def timed_call(phase: str):
+    """Counts an async function's time towards a phase; the signature stays visible to FastAPI's Depends."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with timed(phase):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+    """Latency histograms, status counts and phase totals per route, kept in process memory."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.in_flight = 0
+        # (method, route) -> per-bucket counts, with a last slot for +Inf
+        self.histograms: dict[tuple[str, str], list[int]] = {}
+        self.sums: dict[tuple[str, str], float] = {}
+        self.statuses: dict[tuple[str, str, int], int] = {}
+        self.queries: dict[tuple[str, str], int] = {}
+        self.phase_sums: dict[tuple[str, str, str], float] = {}
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, phases: dict, queries: int):
+        key = (method, route)
+        counts = self.histograms.setdefault(key, [0] * (len(self.buckets) + 1))
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self.sums[key] = self.sums.get(key, 0.0) + seconds
+        self.queries[key] = self.queries.get(key, 0) + queries
+        self.statuses[(method, route, status_code)] = self.statuses.get((method, route, status_code), 0) + 1
+        for phase, phase_seconds in phases.items():
+            self.phase_sums[(method, route, phase)] = self.phase_sums.get((method, route, phase), 0.0) + phase_seconds
+
+    def reset(self):
+        self.__init__(self.buckets)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds Time from receiving a request to sending its last byte.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), counts in sorted(self.histograms.items()):
+            labels = f'method="{method}",route="{escape_label(route)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {self.sums[(method, route)]}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+        lines += [
+            "# HELP http_requests_total Responses sent, by status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self.statuses.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{escape_label(route)}",'
+                         f'status="{status_code}"}} {count}')
+        lines += [
+            "# HELP http_request_queries_total SQL statements issued while serving requests.",
+            "# TYPE http_request_queries_total counter",
+        ]
+        for (method, route), count in sorted(self.queries.items()):
+            lines.append(f'http_request_queries_total{{method="{method}",route="{escape_label(route)}"}} {count}')
+        lines += [
+            "# HELP http_request_phase_seconds_total Time spent in auth, db and serialize, summed over requests.",
+            "# TYPE http_request_phase_seconds_total counter",
+        ]
+        for (method, route, phase), seconds in sorted(self.phase_sums.items()):
+            lines.append(f'http_request_phase_seconds_total{{method="{method}",route="{escape_label(route)}",'
+                         f'phase="{phase}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def route_label(scope: dict, root_path: str) -> str:
+    # The route template, never the raw path, so /todos/1 and /todos/2 share one series
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        # Mounted apps such as /static don't set a route
+        return scope["root_path"][len(root_path):] + "/{path}"
+    return "unmatched"
+
+
+def server_timing(phases: dict, queries: int, total: float) -> str:
+    entries = []
+    for phase in PHASES:
+        if phase in phases:
+            description = f';desc="{queries} queries"' if phase == "db" else ""
+            entries.append(f"{phase};dur={phases[phase] * 1000:.1f}{description}")
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """Pure ASGI, so it neither buffers streaming responses nor moves the app onto another task."""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        phases = {}
+        token = request_phases.set(phases)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    if queries.count:
+                        phases["db"] = queries.time
+                    header = server_timing(phases, queries.count, time.perf_counter() - started)
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        self.metrics.in_flight += 1
+        with track_queries(f"{scope['method']} {scope['path']}") as queries:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self.metrics.in_flight -= 1
+                request_phases.reset(token)
+                if queries.count:
+                    phases["db"] = queries.time
+                self.metrics.observe(scope["method"], route_label(scope, root_path), status_code,
+                                     time.perf_counter() - started, phases, queries.count)
@@ -0,0 +1,59 @@
+"""Peak Python memory of the old load-everything admin listing vs the streaming export, measured in-process.
+
+    python -m benchmarks.admin_export --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from .data import seed_todos  # first, so DATABASE_URL is set before app is imported
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+from app.database import get_session_factory, dispose_engine
+from app.models import Todos
+from app.routers.admin import stream_export
+
+from .common import print_report
+
+
+async def load_everything() -> int:
+    async with get_session_factory()() as db:
+        todos = (await db.execute(select(Todos))).scalars().all()
+        return len(json.dumps(jsonable_encoder(todos)))
+
+
+async def stream_everything(export_format: str) -> int:
+    size = 0
+    async for chunk in stream_export(get_session_factory(), export_format, None):
+        size += len(chunk)
+    return size
+
+
+async def measure(name: str, coroutine) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await coroutine
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {f"{name}_bytes": size, f"{name}_peak_mib": round(peak / 2 ** 20, 1), f"{name}_s": round(elapsed, 2)}
+
+
+async def main(args: argparse.Namespace):
+    await seed_todos(args.rows)
+    results = {"rows": args.rows}
+    results.update(await measure("load_all_json", load_everything()))
+    results.update(await measure("stream_ndjson", stream_everything("ndjson")))
+    results.update(await measure("stream_csv", stream_everything("csv")))
+    await dispose_engine()
+    print_report("admin_export", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,53 @@
+"""Per-request cost of authenticating a bearer token, measured in-process.
+
+    python -m benchmarks.auth_overhead --iterations 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.routers.auth import generate_access_token, decode_access_token, get_current_user, token_cache  # noqa: E402
+
+from .common import print_report  # noqa: E402
+
+CLAIMS = {"sub": "benchuser", "user_id": 1, "user_role": "user"}
+
+
+def time_per_call(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(args: argparse.Namespace):
+    token = generate_access_token(CLAIMS, timedelta(minutes=15))
+    loop = asyncio.new_event_loop()
+
+    def uncached():
+        token_cache.clear()
+        loop.run_until_complete(get_current_user(token))
+
+    def cached():
+        loop.run_until_complete(get_current_user(token))
+
+    results = {
+        "decode_jose_us": time_per_call(lambda: decode_access_token(token, backend="jose"), args.iterations),
+        "decode_pyjwt_us": time_per_call(lambda: decode_access_token(token, backend="pyjwt"), args.iterations),
+        "get_current_user_uncached_us": time_per_call(uncached, args.iterations),
+        "get_current_user_cached_us": time_per_call(cached, args.iterations),
+        "event_loop_overhead_us": time_per_call(lambda: loop.run_until_complete(asyncio.sleep(0)), args.iterations),
+    }
+    loop.close()
+    print_report("auth_overhead", {"iterations": args.iterations,
+                                   **{name: round(value, 2) for name, value in results.items()}})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
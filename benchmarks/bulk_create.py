@@ -0,0 +1,55 @@
+"""Create the same todos one request at a time and through POST /todos/bulk.
+
+    DATABASE_URL=sqlite:///./bench.db uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.bulk_create --base-url http://127.0.0.1:8000 --todos 10000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from .common import ensure_user, print_report
+
+
+def make_todos(count: int) -> list[dict]:
+    return [{"title": f"Todo {index}", "description": "Benchmark todo", "priority": index % 5 + 1}
+            for index in range(count)]
+
+
+async def main(args: argparse.Namespace):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        token = await ensure_user(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        todos = make_todos(args.todos)
+
+        started = time.perf_counter()
+        for todo in todos:
+            (await client.post("/todos/", headers=headers, json=todo)).raise_for_status()
+        one_by_one = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for offset in range(0, len(todos), args.batch_size):
+            batch = todos[offset:offset + args.batch_size]
+            (await client.post("/todos/bulk", headers=headers, json=batch)).raise_for_status()
+        bulk = time.perf_counter() - started
+
+        print_report("bulk_create", {
+            "todos": args.todos,
+            "batch_size": args.batch_size,
+            "one_by_one_s": round(one_by_one, 3),
+            "one_by_one_todos_per_s": round(args.todos / one_by_one, 1),
+            "bulk_s": round(bulk, 3),
+            "bulk_todos_per_s": round(args.todos / bulk, 1),
+            "speedup": round(one_by_one / bulk, 1),
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="benchuser")
+    parser.add_argument("--password", default="12345aA@")
+    parser.add_argument("--todos", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
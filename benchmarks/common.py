@@ -0,0 +1,120 @@
+import asyncio
+import json
+import math
+import re
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+METRIC_LINE = re.compile(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})? (\S+)$")
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+async def run_steps(step: Callable[[int], Awaitable[httpx.Response]], *, concurrency: int, total: int) -> dict:
+    """Runs step(0) .. step(total - 1) on `concurrency` workers, timing each as one request."""
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in remaining:
+            started = time.perf_counter()
+            response = await step(index)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_load(client: httpx.AsyncClient, method: str, url: str, *, concurrency: int, total: int,
+                   **request_kwargs) -> dict:
+    return await run_steps(lambda _: client.request(method, url, **request_kwargs), concurrency=concurrency,
+                           total=total)
+
+
+def parse_metrics(text: str) -> dict[tuple[str, frozenset], float]:
+    # Just enough of the Prometheus text format for the counters app/timing.py exposes
+    samples = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[(name, frozenset(LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+async def scrape_metrics(client: httpx.AsyncClient) -> Optional[dict]:
+    response = await client.get("/metrics")
+    return parse_metrics(response.text) if response.status_code == 200 else None
+
+
+def queries_per_request(before: Optional[dict], after: Optional[dict]) -> Optional[dict]:
+    """DB statements per request for each route between two scrapes, leaving out the scrapes themselves."""
+    if before is None or after is None:
+        return None
+    per_route = {}
+    for metric in ("http_request_queries_total", "http_request_duration_seconds_count"):
+        for (name, labels), value in after.items():
+            route = dict(labels).get("route")
+            if name != metric or route == "/metrics":
+                continue
+            key = f'{dict(labels)["method"]} {route}'
+            per_route.setdefault(key, {})[metric] = value - before.get((name, labels), 0.0)
+    routes = {}
+    for key, counts in per_route.items():
+        if counts.get("http_request_duration_seconds_count"):
+            routes[key] = round(counts.get("http_request_queries_total", 0.0)
+                                / counts["http_request_duration_seconds_count"], 2)
+    requests = sum(counts.get("http_request_duration_seconds_count", 0.0) for counts in per_route.values())
+    queries = sum(counts.get("http_request_queries_total", 0.0) for counts in per_route.values())
+    return {"overall": round(queries / requests, 2) if requests else 0.0, "routes": routes}
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def ensure_user(client: httpx.AsyncClient, username: str, password: str, role: str = "user") -> str:
+    await client.post("/auth/register", json={
+        "email": f"{username}@example.com",
+        "username": username,
+        "first_name": "Bench",
+        "last_name": "Mark",
+        "password": password,
+        "password_confirm": password,
+        "role": role,
+        "phone_number": "0123456789",
+    })
+    return await login(client, username, password)
+
+
+def print_report(name: str, results: dict, file=None):
+    print(json.dumps({"benchmark": name, **results}, indent=2), file=file)
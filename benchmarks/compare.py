@@ -0,0 +1,72 @@
+"""Compares two benchmarks.suite reports, e.g. from two commits, and fails on regressions.
+
+    python -m benchmarks.compare base.json head.json --threshold 10
+
+Exits with status 1 when a scenario's throughput drops, or a latency percentile or its DB queries per request
+rise, by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+
+# Metric, and whether a higher value is better
+METRICS = [
+    ("requests_per_s", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("errors", False),
+]
+
+
+def queries(scenario: dict):
+    return (scenario.get("queries_per_request") or {}).get("overall")
+
+
+def change(base: float, head: float) -> float:
+    if base == 0:
+        return 0.0 if head == 0 else float("inf")
+    return (head - base) / base * 100
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[str], list[str]]:
+    lines, regressions = [], []
+    for name, head_scenario in head["scenarios"].items():
+        base_scenario = base["scenarios"].get(name)
+        if base_scenario is None:
+            lines.append(f"{name}: not in the base report")
+            continue
+        rows = [(metric, higher_is_better, base_scenario[metric], head_scenario[metric])
+                for metric, higher_is_better in METRICS]
+        if queries(base_scenario) is not None and queries(head_scenario) is not None:
+            rows.append(("queries_per_request", False, queries(base_scenario), queries(head_scenario)))
+        for metric, higher_is_better, base_value, head_value in rows:
+            delta = change(base_value, head_value)
+            worse = -delta if higher_is_better else delta
+            flag = " REGRESSION" if worse > threshold else ""
+            lines.append(f"{name:14} {metric:20} {base_value:>10} -> {head_value:>10} ({delta:+.1f}%){flag}")
+            if flag:
+                regressions.append(f"{name} {metric}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as base_file, open(args.head) as head_file:
+        base, head = json.load(base_file), json.load(head_file)
+    print(f"{base.get('revision')} -> {head.get('revision')} ({head.get('database')}, {head.get('users')} users x "
+          f"{head.get('todos_per_user')} todos)")
+    lines, regressions = compare(base, head, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
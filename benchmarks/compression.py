@@ -0,0 +1,103 @@
+"""CPU cost against bytes saved when compressing todo payloads, per encoding and level, measured in-process.
+
+Payloads are GET /todos/ bodies of different lengths and one batch of the admin NDJSON export, rendered the way
+the app renders them. Pick COMPRESSION_*_LEVEL from where the saved bytes stop being worth the extra time.
+
+    python -m benchmarks.compression --iterations 50
+"""
+import argparse
+import gzip
+import importlib
+import os
+import time
+from collections import namedtuple
+from typing import Callable
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.compression import StreamCompressor, available_encodings  # noqa: E402
+from app.responses import JSON_RESPONSE_CLASSES  # noqa: E402
+from app.routers.admin import encode_ndjson  # noqa: E402
+
+from .common import print_report  # noqa: E402
+from .serialization import make_todos, todo_list_adapter  # noqa: E402
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6, 9), "zstd": (1, 3, 9)}
+
+
+def compressors() -> dict[str, Callable[[bytes], bytes]]:
+    found = {f"gzip_{level}": lambda data, level=level: gzip.compress(data, compresslevel=level, mtime=0)
+             for level in LEVELS["gzip"]}
+    try:
+        brotli = importlib.import_module("brotli")
+        found.update({f"br_{quality}": lambda data, quality=quality: brotli.compress(data, quality=quality)
+                      for quality in LEVELS["br"]})
+    except ImportError:
+        pass
+    try:
+        zstandard = importlib.import_module("zstandard")
+        found.update({f"zstd_{level}": lambda data, level=level: zstandard.ZstdCompressor(level=level).compress(data)
+                      for level in LEVELS["zstd"]})
+    except ImportError:
+        pass
+    return found
+
+
+def export_rows(count: int) -> list:
+    todos = make_todos(count)
+    Row = namedtuple("Row", todos[0].keys())
+    return [Row(**todo) for todo in todos]
+
+
+def make_payloads(sizes: list[int]) -> dict[str, bytes]:
+    response_class = JSON_RESPONSE_CLASSES["orjson"]
+    payloads = {}
+    for size in sizes:
+        todos = todo_list_adapter.dump_python(todo_list_adapter.validate_python(make_todos(size)), mode="json")
+        payloads[f"list_{size}"] = response_class(todos).body
+    payloads["export_batch_1000"] = encode_ndjson(export_rows(1000))
+    return payloads
+
+
+def streamed_size(encoding: str, chunks: list[bytes]) -> int:
+    # The middleware flushes after every chunk of a streamed body, which costs some ratio
+    compressor = StreamCompressor(encoding)
+    return sum(len(compressor.compress(chunk, more)) for more, chunk in
+               zip([True] * (len(chunks) - 1) + [False], chunks))
+
+
+def time_per_call(fn, data: bytes, iterations: int) -> tuple[float, int]:
+    size = len(fn(data))
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(data)
+    return (time.perf_counter() - started) / iterations * 1_000_000, size
+
+
+def main(args: argparse.Namespace):
+    results = {}
+    for payload_name, data in make_payloads(args.sizes).items():
+        rows = {"bytes": len(data)}
+        for name, compress in compressors().items():
+            microseconds, size = time_per_call(compress, data, args.iterations)
+            rows[name] = {
+                "bytes": size,
+                "saved_pct": round((1 - size / len(data)) * 100, 1),
+                "us": round(microseconds, 1),
+                # Bytes saved per microsecond of CPU, the number to compare levels by
+                "saved_per_us": round((len(data) - size) / microseconds, 1),
+            }
+        if payload_name.startswith("export"):
+            # As a stream of ten chunks at the middleware's own levels
+            rows_per_chunk = [encode_ndjson(export_rows(1000)[start:start + 100]) for start in range(0, 1000, 100)]
+            rows["streamed_10_chunks"] = {encoding: streamed_size(encoding, rows_per_chunk)
+                                          for encoding in available_encodings()}
+        results[payload_name] = rows
+    print_report("compression", {"iterations": args.iterations, "payloads": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--iterations", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""Seeds a throwaway database for the in-process benchmarks.
+
+Importing this module points DATABASE_URL at a scratch SQLite file unless one is already set, so it must be
+imported before anything from app.
+"""
+import os
+import tempfile
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), "bench_todos.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{BENCH_DB}")
+
+from sqlalchemy import insert, delete, text  # noqa: E402
+
+from app.database import get_engine  # noqa: E402
+from app.models import Base, Todos, Users, TodoCounters  # noqa: E402
+from app.passwords import get_password_context  # noqa: E402
+
+SEED_BATCH_SIZE = 10000
+
+
+async def seed_todos(rows: int, users: int = 1):
+    async with get_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(delete(Todos))
+        await connection.execute(delete(TodoCounters))
+        await connection.execute(delete(Users))
+        await connection.execute(insert(Users), [{"id": user_id, "username": f"bench{user_id}",
+                                                  "email": f"bench{user_id}@example.com", "role": "admin",
+                                                  "phone_number": "0123456789"} for user_id in range(1, users + 1)])
+        await connection.execute(insert(Todos), [{"user_id": index % users + 1, "title": f"Todo {index}",
+                                                  "description": "x" * 100, "priority": index % 5 + 1,
+                                                  "completed": index % 3 == 0} for index in range(rows)])
+
+
+async def seed_dataset(users: int, todos_per_user: int, password: str) -> list[int]:
+    """N users x M todos that can log in over HTTP; user 1 is an admin. Returns the user ids."""
+    # One hash for everyone, the cost of hashing is what the login scenario measures, not the seeding
+    hashed_password = get_password_context().hash(password)
+    async with get_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(delete(Todos))
+        await connection.execute(delete(TodoCounters))
+        await connection.execute(delete(Users))
+        await connection.execute(insert(Users), [
+            {"id": user_id, "username": f"bench{user_id}", "email": f"bench{user_id}@example.com",
+             "first_name": "Bench", "last_name": "Mark", "is_active": True,
+             "role": "admin" if user_id == 1 else "user", "phone_number": "0123456789",
+             "hashed_password": hashed_password}
+            for user_id in range(1, users + 1)
+        ])
+        rows = ({"user_id": user_id, "title": f"Todo {index} of user {user_id}", "description": "x" * 100,
+                 "priority": index % 5 + 1, "completed": index % 3 == 0}
+                for user_id in range(1, users + 1) for index in range(todos_per_user))
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == SEED_BATCH_SIZE:
+                await connection.execute(insert(Todos), batch)
+                batch = []
+        if batch:
+            await connection.execute(insert(Todos), batch)
+        if connection.dialect.name == "postgresql":
+            # The ids were given explicitly, so move the sequence past them for users registered later
+            await connection.execute(text("""SELECT setval(pg_get_serial_sequence('"Users"', 'id'), :users)"""),
+                                     {"users": users})
+    return list(range(1, users + 1))
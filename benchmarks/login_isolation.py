@@ -0,0 +1,64 @@
+"""GET /todos/ latency on its own and while a /auth/login storm runs on the same worker.
+
+    DATABASE_URL=sqlite:///./bench.db uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.login_isolation --base-url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from .common import ensure_user, run_load, print_report
+
+
+async def login_storm(client: httpx.AsyncClient, args: argparse.Namespace, stop: asyncio.Event) -> int:
+    logins = 0
+
+    async def worker():
+        nonlocal logins
+        while not stop.is_set():
+            await client.post("/auth/login", data={"username": args.username, "password": args.password})
+            logins += 1
+
+    await asyncio.gather(*(worker() for _ in range(args.login_concurrency)))
+    return logins
+
+
+async def main(args: argparse.Namespace):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        token = await ensure_user(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        for index in range(args.seed):
+            await client.post("/todos/", headers=headers, json={
+                "title": f"Todo {index}", "description": "Benchmark todo", "priority": index % 5 + 1,
+            })
+
+        quiet = await run_load(client, "GET", "/todos/", concurrency=args.concurrency, total=args.requests,
+                               headers=headers)
+
+        stop = asyncio.Event()
+        storm = asyncio.create_task(login_storm(client, args, stop))
+        await asyncio.sleep(1)
+        during_storm = await run_load(client, "GET", "/todos/", concurrency=args.concurrency, total=args.requests,
+                                      headers=headers)
+        stop.set()
+        logins = await storm
+
+        print_report("login_isolation", {
+            "login_concurrency": args.login_concurrency,
+            "logins_completed": logins,
+            "todos_quiet": quiet,
+            "todos_during_login_storm": during_storm,
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="benchuser")
+    parser.add_argument("--password", default="12345aA@")
+    parser.add_argument("--seed", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""Memory and time to list todos as ORM instances vs column projections, measured in-process.
+
+"orm" is the old read path: hydrate Todos instances, then FastAPI's implicit jsonable_encoder + json.dumps.
+"projection" is the current one: select the columns into row mappings, then validate and dump through the
+TodoResponse response model the way FastAPI does.
+
+    python -m benchmarks.row_projection --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from .data import seed_todos  # first, so DATABASE_URL is set before app is imported
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from app.database import get_session_factory, dispose_engine
+from app.models import Todos
+from app.routers.todos import TODO_COLUMNS, TodoResponse
+
+from .common import print_report
+
+todo_list_adapter = TypeAdapter(list[TodoResponse])
+
+
+async def fetch_orm():
+    async with get_session_factory()() as db:
+        return (await db.execute(select(Todos))).scalars().all()
+
+
+async def fetch_projection():
+    async with get_session_factory()() as db:
+        return (await db.execute(select(*TODO_COLUMNS))).mappings().all()
+
+
+def serialize_orm(todos) -> str:
+    return json.dumps(jsonable_encoder(todos))
+
+
+def serialize_projection(rows) -> str:
+    return json.dumps(todo_list_adapter.dump_python(todo_list_adapter.validate_python(rows), mode="json"))
+
+
+async def measure(name: str, fetch, serialize) -> dict:
+    # Timings come from an untraced pass; tracemalloc slows allocation-heavy code down several times over
+    started = time.perf_counter()
+    body = serialize(await fetch())
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    rows = await fetch()
+    held, fetch_peak = tracemalloc.get_traced_memory()
+    serialize(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        f"{name}_rows_held_mib": round(held / 2 ** 20, 1),
+        f"{name}_peak_mib": round(max(fetch_peak, peak) / 2 ** 20, 1),
+        f"{name}_total_s": round(elapsed, 2),
+        f"{name}_bytes": len(body),
+    }
+
+
+async def main(args: argparse.Namespace):
+    await seed_todos(args.rows)
+    results = {"rows": args.rows}
+    results.update(await measure("orm", fetch_orm, serialize_orm))
+    results.update(await measure("projection", fetch_projection, serialize_projection))
+    await dispose_engine()
+    print_report("row_projection", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+"""Cost of turning 1k todos into a JSON response body, per response class, measured in-process.
+
+"implicit" is the old path for routes without a response_model: jsonable_encoder, then stdlib json. The
+other rows validate and dump through the TodoResponse model, the way FastAPI does once a response_model is
+declared, then render with the given response class.
+
+    python -m benchmarks.serialization --todos 1000 --iterations 200
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.responses import JSON_RESPONSE_CLASSES  # noqa: E402
+from app.routers.todos import TodoResponse  # noqa: E402
+
+from .common import print_report  # noqa: E402
+
+todo_list_adapter = TypeAdapter(list[TodoResponse])
+
+
+def make_todos(count: int) -> list[dict]:
+    updated_at = datetime.now(timezone.utc)
+    return [{"id": index, "user_id": 1, "title": f"Todo {index}", "description": "x" * 100,
+             "priority": index % 5 + 1, "completed": index % 3 == 0, "updated_at": updated_at}
+            for index in range(count)]
+
+
+def time_per_call(fn, iterations: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(args: argparse.Namespace):
+    todos = make_todos(args.todos)
+
+    def through_model():
+        return todo_list_adapter.dump_python(todo_list_adapter.validate_python(todos), mode="json")
+
+    results = {"implicit_json_us": time_per_call(lambda: JSONResponse(jsonable_encoder(todos)), args.iterations)}
+    for name, response_class in JSON_RESPONSE_CLASSES.items():
+        results[f"model_{name}_us"] = time_per_call(lambda: response_class(through_model()), args.iterations)
+    results["model_only_us"] = time_per_call(through_model, args.iterations)
+    print_report("serialization", {"todos": args.todos, "iterations": args.iterations,
+                                   **{name: round(value, 1) for name, value in results.items()}})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--todos", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
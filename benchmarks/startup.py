@@ -0,0 +1,104 @@
+"""Cold-start cost of a worker: an import-time profile of app.main and the time until uvicorn serves.
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --import-budget-ms 2000 --startup-budget-ms 4500
+
+Every run is a fresh interpreter, so nothing is cached in-process, but the OS file cache and .pyc files are
+warm after the first one. Exits with status 1 when a median goes over its budget; take the budgets from a
+baseline run on the machine that enforces them, absolute numbers differ a lot between machines.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .common import print_report
+
+# A scratch database; the app must not need one to import or to answer its health check
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_startup.db')}")
+
+
+def profile_import() -> tuple[float, dict[str, float]]:
+    """Runs `import app.main` under -X importtime, returning its total and the self time per module, in ms."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True,
+                            text=True, check=True)
+    total, self_times = 0.0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_times[name.strip()] = int(self_us) / 1000
+        if name.strip() == "app.main":
+            total = int(cumulative_us) / 1000
+    return total, self_times
+
+
+def by_package(self_times: dict[str, float]) -> dict[str, float]:
+    # app modules individually, everything else folded into its top-level package
+    packages = {}
+    for name, ms in self_times.items():
+        package = name if name.startswith("app.") or name == "app" else name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + ms
+    return packages
+
+
+def measure_startup(port: int, timeout: float = 30) -> float:
+    """Milliseconds from spawning uvicorn to its first successful health check."""
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                               "--log-level", "warning"])
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return (time.perf_counter() - started) * 1000
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"uvicorn did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import profile")
+    parser.add_argument("--import-budget-ms", type=float)
+    parser.add_argument("--startup-budget-ms", type=float)
+    args = parser.parse_args()
+
+    # One untimed run so every measured one finds the .pyc files already written
+    profile_import()
+    profiles = [profile_import() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in profiles)
+    median_profile = sorted(profiles, key=lambda profile: profile[0])[len(profiles) // 2][1]
+    packages = sorted(by_package(median_profile).items(), key=lambda item: item[1], reverse=True)[:args.top]
+    startup_ms = statistics.median(measure_startup(args.port) for _ in range(args.runs))
+
+    over_budget = []
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        over_budget.append("import")
+    if args.startup_budget_ms is not None and startup_ms > args.startup_budget_ms:
+        over_budget.append("startup")
+    print_report("startup", {
+        "runs": args.runs,
+        "import_ms": round(import_ms, 1),
+        "startup_ms": round(startup_ms, 1),
+        "import_self_ms_by_package": {package: round(ms, 1) for package, ms in packages},
+        "budget": {"import_ms": args.import_budget_ms, "startup_ms": args.startup_budget_ms,
+                   "over": over_budget},
+    })
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Concurrent GET /todos/ load against a running server.
+
+Start one uvicorn worker, then run for example:
+
+    DATABASE_URL=sqlite:///./bench.db uvicorn app.main:app --workers 1 --port 8000
+    python -m benchmarks.todos_list --base-url http://127.0.0.1:8000 --seed 200 --concurrency 100
+
+Run it once on each revision you want to compare and diff the printed JSON.
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from .common import ensure_user, run_load, print_report
+
+
+async def main(args: argparse.Namespace):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = await ensure_user(client, args.username, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        for index in range(args.seed):
+            await client.post("/todos/", headers=headers, json={
+                "title": f"Todo {index}", "description": "Benchmark todo", "priority": index % 5 + 1,
+            })
+
+        await run_load(client, "GET", "/todos/", concurrency=args.concurrency, total=args.warmup, headers=headers)
+        results = await run_load(client, "GET", "/todos/", concurrency=args.concurrency, total=args.requests,
+                                 headers=headers)
+        print_report("todos_list", {"concurrency": args.concurrency, **results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="benchuser")
+    parser.add_argument("--password", default="12345aA@")
+    parser.add_argument("--seed", type=int, default=0, help="todos to create for the benchmark user first")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
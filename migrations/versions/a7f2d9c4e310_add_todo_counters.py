@@ -0,0 +1,109 @@
+"""Add TodoCounters
+
+Revision ID: a7f2d9c4e310
+Revises: e8d35b1c6f07
+Create Date: 2026-10-18 15:48:26.905184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f2d9c4e310'
+down_revision: Union[str, None] = 'e8d35b1c6f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Copied from app.models as of this revision
+POSTGRES_COUNTERS_DDL = [
+    """CREATE FUNCTION todo_counters_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL THEN
+            UPDATE "TodoCounters" SET count = count - 1
+            WHERE user_id = OLD.user_id AND priority = coalesce(OLD.priority, 0)
+                AND completed = coalesce(OLD.completed, false);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.deleted_at IS NULL THEN
+            INSERT INTO "TodoCounters" (user_id, priority, completed, count)
+            VALUES (NEW.user_id, coalesce(NEW.priority, 0), coalesce(NEW.completed, false), 1)
+            ON CONFLICT (user_id, priority, completed) DO UPDATE SET count = "TodoCounters".count + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER todo_counters_insert_delete AFTER INSERT OR DELETE ON "Todos"
+    FOR EACH ROW EXECUTE FUNCTION todo_counters_apply()""",
+    # Title and description edits don't move a todo between buckets, so they skip the counters entirely
+    """CREATE TRIGGER todo_counters_update AFTER UPDATE ON "Todos" FOR EACH ROW
+    WHEN ((OLD.user_id, OLD.priority, OLD.completed, OLD.deleted_at IS NULL)
+        IS DISTINCT FROM (NEW.user_id, NEW.priority, NEW.completed, NEW.deleted_at IS NULL))
+    EXECUTE FUNCTION todo_counters_apply()""",
+]
+
+SQLITE_COUNTERS_MOVED = """(old.user_id IS NOT new.user_id OR old.priority IS NOT new.priority
+        OR old.completed IS NOT new.completed OR (old.deleted_at IS NULL) IS NOT (new.deleted_at IS NULL))"""
+
+SQLITE_COUNTERS_DDL = [
+    """CREATE TRIGGER todo_counters_insert AFTER INSERT ON Todos WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO TodoCounters (user_id, priority, completed, count)
+        VALUES (new.user_id, coalesce(new.priority, 0), coalesce(new.completed, 0), 1)
+        ON CONFLICT (user_id, priority, completed) DO UPDATE SET count = count + 1;
+    END""",
+    """CREATE TRIGGER todo_counters_delete AFTER DELETE ON Todos WHEN old.deleted_at IS NULL BEGIN
+        UPDATE TodoCounters SET count = count - 1
+        WHERE user_id = old.user_id AND priority = coalesce(old.priority, 0)
+            AND completed = coalesce(old.completed, 0);
+    END""",
+    f"""CREATE TRIGGER todo_counters_update_old AFTER UPDATE ON Todos
+    WHEN old.deleted_at IS NULL AND {SQLITE_COUNTERS_MOVED} BEGIN
+        UPDATE TodoCounters SET count = count - 1
+        WHERE user_id = old.user_id AND priority = coalesce(old.priority, 0)
+            AND completed = coalesce(old.completed, 0);
+    END""",
+    f"""CREATE TRIGGER todo_counters_update_new AFTER UPDATE ON Todos
+    WHEN new.deleted_at IS NULL AND {SQLITE_COUNTERS_MOVED} BEGIN
+        INSERT INTO TodoCounters (user_id, priority, completed, count)
+        VALUES (new.user_id, coalesce(new.priority, 0), coalesce(new.completed, 0), 1)
+        ON CONFLICT (user_id, priority, completed) DO UPDATE SET count = count + 1;
+    END""",
+]
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('TodoCounters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['Users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'priority', 'completed')
+    )
+    # ### end Alembic commands ###
+    # The triggers keep the counters current from here on, the backfill counts what is already there
+    dialect = op.get_bind().dialect.name
+    for statement in {'postgresql': POSTGRES_COUNTERS_DDL, 'sqlite': SQLITE_COUNTERS_DDL}.get(dialect, []):
+        op.execute(statement)
+    op.execute("""INSERT INTO "TodoCounters" (user_id, priority, completed, count)
+        SELECT user_id, coalesce(priority, 0), coalesce(completed, false), count(*) FROM "Todos"
+        WHERE deleted_at IS NULL
+        GROUP BY user_id, coalesce(priority, 0), coalesce(completed, false)""")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP TRIGGER todo_counters_update ON "Todos"')
+        op.execute('DROP TRIGGER todo_counters_insert_delete ON "Todos"')
+        op.execute('DROP FUNCTION todo_counters_apply()')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER todo_counters_update_new')
+        op.execute('DROP TRIGGER todo_counters_update_old')
+        op.execute('DROP TRIGGER todo_counters_delete')
+        op.execute('DROP TRIGGER todo_counters_insert')
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('TodoCounters')
+    # ### end Alembic commands ###
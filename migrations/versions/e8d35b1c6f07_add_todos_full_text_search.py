@@ -0,0 +1,56 @@
+"""Add Todos full-text search
+
+Revision ID: e8d35b1c6f07
+Revises: c41f8e2d7a95
+Create Date: 2026-10-18 14:37:09.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8d35b1c6f07'
+down_revision: Union[str, None] = 'c41f8e2d7a95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Hand written: the search structures are dialect specific and not part of the mapped columns
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""ALTER TABLE "Todos" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED""")
+        op.execute("""CREATE INDEX "ix_Todos_search_vector" ON "Todos" USING GIN (search_vector)""")
+    elif op.get_bind().dialect.name == 'sqlite':
+        op.execute("""CREATE VIRTUAL TABLE todos_fts USING fts5(
+            title, description, content='Todos', content_rowid='id', tokenize='porter unicode61'
+        )""")
+        op.execute("""CREATE TRIGGER todos_fts_insert AFTER INSERT ON Todos BEGIN
+            INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END""")
+        op.execute("""CREATE TRIGGER todos_fts_delete AFTER DELETE ON Todos BEGIN
+            INSERT INTO todos_fts(todos_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END""")
+        op.execute("""CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON Todos BEGIN
+            INSERT INTO todos_fts(todos_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END""")
+        # Index the rows that already exist
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX "ix_Todos_search_vector"')
+        op.execute('ALTER TABLE "Todos" DROP COLUMN search_vector')
+    elif op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER todos_fts_update")
+        op.execute("DROP TRIGGER todos_fts_delete")
+        op.execute("DROP TRIGGER todos_fts_insert")
+        op.execute("DROP TABLE todos_fts")